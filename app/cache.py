@@ -1,30 +1,814 @@
+import asyncio
+import contextlib
+import functools
+import gzip
+import hashlib
 import json
-from typing import Any
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Collection, cast
 
+import brotli  # type: ignore[import]
 import redis.asyncio as redis
-from fastapi import Depends
-from fastapi.encoders import jsonable_encoder
+from fastapi import Depends, Request
+from redis.exceptions import LockError, WatchError
+from starlette import status
+from starlette.background import BackgroundTasks
+from starlette.exceptions import HTTPException
 
-from app.database import get_redis_session
+from app.config import (
+    CACHE_BROTLI_LEVEL,
+    CACHE_COMPRESSION_MIN_SIZE,
+    CACHE_GZIP_LEVEL,
+    CACHE_INDEX_MAX_KEYS,
+    CACHE_INVALIDATION_CHANNEL,
+    CACHE_L1_MAX_BYTES,
+    CACHE_L1_MAX_ITEMS,
+    CACHE_L1_TTL,
+    CACHE_LOCK_TTL,
+    CACHE_LOCK_WAIT,
+    CACHE_NEGATIVE_TTL,
+    CACHE_SOFT_TTL,
+    CACHE_TTL,
+)
+from app.database import (
+    REDIS_URL,
+    current_write_state,
+    get_redis_session,
+    has_pending_write,
+    wait_for_replica,
+)
+from app.metrics import CACHE_OPERATIONS
+
+
+class LocalCache:
+    """In-process LRU cache with per-entry TTL, bounded by items count and payload size"""
+
+    def __init__(self, max_items: int, max_bytes: int, ttl: float):
+        self.__entries: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+        self.__max_items = max_items
+        self.__max_bytes = max_bytes
+        self.__ttl = ttl
+        self.__size = 0
+        self.enabled = False
+
+    def get(self, key: str) -> Any | None:
+        entry = self.__entries.get(key)
+
+        if entry is None:
+            return None
+
+        expires_at, _, value = entry
+
+        if expires_at < time.monotonic():
+            self.__pop(key)
+
+            return None
+
+        self.__entries.move_to_end(key)
+
+        return value
+
+    def set(self, key: str, value: Any, size: int) -> None:
+        self.__pop(key)
+
+        if size > self.__max_bytes:
+            return
+
+        self.__entries[key] = (time.monotonic() + self.__ttl, size, value)
+        self.__size += size
+
+        while len(self.__entries) > self.__max_items or self.__size > self.__max_bytes:
+            _, (_, evicted_size, _) = self.__entries.popitem(last=False)
+            self.__size -= evicted_size
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.__pop(key)
+
+    def clear(self) -> None:
+        self.__entries.clear()
+        self.__size = 0
+
+    def __pop(self, key: str) -> None:
+        entry = self.__entries.pop(key, None)
+
+        if entry is not None:
+            self.__size -= entry[1]
+
+
+class CacheInvalidationListener:
+    """Keeps the local cache of the process coherent with deletions made by other processes"""
+
+    def __init__(self, local_cache: LocalCache, channel: str):
+        self.__local_cache = local_cache
+        self.__channel = channel
+        self.__task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self.__task is None:
+            self.__task = asyncio.create_task(self.__listen())
+
+    async def stop(self) -> None:
+        if self.__task is None:
+            return
+
+        self.__task.cancel()
+
+        with contextlib.suppress(asyncio.CancelledError):
+            await self.__task
+
+        self.__task = None
+        self.__disable()
+
+    async def __listen(self) -> None:
+        while True:
+            try:
+                session = redis.from_url(REDIS_URL, socket_keepalive=True)
+                pubsub = session.pubsub()
+
+                async with session, pubsub:
+                    await pubsub.subscribe(self.__channel)
+                    self.__local_cache.enabled = True
+
+                    async for message in pubsub.listen():
+                        if message['type'] == 'message':
+                            self.__local_cache.delete(*json.loads(message['data']))
+            except redis.RedisError:
+                self.__disable()
+
+                await asyncio.sleep(1)
+
+    def __disable(self) -> None:
+        self.__local_cache.enabled = False
+        self.__local_cache.clear()
+
+
+local_cache = LocalCache(CACHE_L1_MAX_ITEMS, CACHE_L1_MAX_BYTES, CACHE_L1_TTL)
+invalidation_listener = CacheInvalidationListener(local_cache, CACHE_INVALIDATION_CHANNEL)
+inflight_loads: dict[str, asyncio.Future] = {}
+
+# Cached in place of a missing entity, never a valid JSON document
+NOT_FOUND = b'\x00'
+
+# Computes the new payload of an entry from the cached one, None when nothing is cached; None drops the entry
+Patcher = Callable[[bytes | None], bytes | None]
+# Returns the patchers of the keys, None to delete the keys instead
+PatchesLoader = Callable[[], Awaitable[dict[str, Patcher] | None]]
+
+# Resolves the versioned key from the versions of KEYS, setting the missing ones to ARGV[2] for ARGV[3]
+# seconds. ARGV[4] is the suffix of the freshness mark, empty without soft TTL, then come the counted
+# suffixes of the entries to read in the order of preference, the counted suffixes of the variants
+# and the ETags sent by the client. Returns the key and 1 if the ETag of a variant matches, without
+# reading any entry, otherwise the key, 0, the index of the first entry found, its value and its mark.
+# The entries are not declared in KEYS: like the WATCH of `patch`, it needs a single Redis instance.
+READ_SCRIPT = """
+local versions = redis.call('MGET', unpack(KEYS))
+
+for i, version in ipairs(versions) do
+    if not version then
+        versions[i] = ARGV[2]
+        redis.call('SET', KEYS[i], ARGV[2], 'EX', ARGV[3])
+    end
+end
+
+local key = ARGV[1] .. '@' .. table.concat(versions, '.')
+local entries_count = tonumber(ARGV[5])
+local variants_count = tonumber(ARGV[6 + entries_count])
+local tags = {}
+
+for i = 7 + entries_count + variants_count, #ARGV do
+    tags[ARGV[i]] = true
+end
+
+for i = 7 + entries_count, 6 + entries_count + variants_count do
+    if tags['"' .. redis.sha1hex(key .. ARGV[i]) .. '"'] then
+        return {key, 1}
+    end
+end
+
+for i = 1, entries_count do
+    local value = redis.call('GET', key .. ARGV[5 + i])
+
+    if value then
+        local fresh = ARGV[4] == '' or redis.call('EXISTS', key .. ARGV[4]) == 1
+
+        return {key, 0, i, value, fresh and 1 or 0}
+    end
+end
+
+return {key, 0, 0, false, 0}
+"""
+
+# Adds ARGV[1] to the index KEYS[1] for ARGV[2] seconds, unless the index holds ARGV[3] keys already:
+# it is then marked as overflowing with the empty member instead
+INDEX_SCRIPT = """
+if redis.call('SCARD', KEYS[1]) < tonumber(ARGV[3]) or redis.call('SISMEMBER', KEYS[1], ARGV[1]) == 1 then
+    redis.call('SADD', KEYS[1], ARGV[1])
+else
+    redis.call('SADD', KEYS[1], '')
+end
+
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+"""
+
+# Keys of the children of the menus and of the submenus in the catalog document
+CATALOG_CHILDREN = ('submenus', 'dishes')
+
+# Content codings of the precompressed variants, in the order of preference
+COMPRESSORS: dict[str, Callable[[bytes], bytes]] = {
+    'br': functools.partial(brotli.compress, quality=CACHE_BROTLI_LEVEL),
+    'gzip': functools.partial(gzip.compress, compresslevel=CACHE_GZIP_LEVEL),
+}
 
 
 class RedisCache:
-    def __init__(self, session: redis.Redis = Depends(get_redis_session)):
+    """Redis cache of the payloads under versioned keys, deleted and invalidated by bumping their versions"""
+
+    scopes_by_family = {
+        'submenus': ('menu:{0}',),
+        'dishes': ('menu:{0}', 'submenu:{1}'),
+        'menus-page': ('menus-list',),
+        'submenus-page': ('menu:{0}', 'submenus-list:{0}'),
+        'dishes-page': ('menu:{0}', 'submenu:{1}', 'dishes-list:{1}'),
+    }
+    compressed_families = {'catalog'}
+    # Number of the parent ids the keys are indexed by
+    indexed_families = {'menus-page': 0, 'submenus-page': 1, 'dishes-page': 2}
+
+    def __init__(
+            self,
+            session: redis.Redis,
+            background_tasks: BackgroundTasks | None = None,
+            request: Request | None = None
+    ):
         self.__session = session
-        self.__ttl = 700
+        self.__bg_tasks = background_tasks
+        self.__request = request
+        self.__ttl = CACHE_TTL
+        self.__soft_ttl = CACHE_SOFT_TTL
 
-    async def get(self, key: str) -> Any | None:
-        data = await self.__session.get(key)
-        result = json.loads(data) if data else None
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[bytes | None]]) -> bytes | None:
+        """Returns the cached payload, loading it once across the processes on a miss"""
+        result, _ = await self.get_or_load_encoded(key, loader)
 
         return result
 
-    async def set(self, key: str, value: Any) -> None:
-        data = json.dumps(jsonable_encoder(value))
+    async def get_or_load_encoded(
+            self,
+            key: str,
+            loader: Callable[[], Awaitable[bytes | None]],
+            encoding: str | None = None
+    ) -> tuple[bytes | None, str | None]:
+        """Returns the cached payload, compressed with the encoding if such a variant is cached, and its encoding"""
+        if self.__request is not None and await has_pending_write(self.__request):
+            CACHE_OPERATIONS.labels(self.__get_family(key), 'bypass').inc()
+
+            return await loader(), None
+
+        request = self.__request
+        conditional = request if request is not None and request.method in ('GET', 'HEAD') else None
+        tags = self.__get_if_none_match(conditional) if conditional is not None else set()
+        key, result, fresh, result_encoding = await self.__lookup(key, encoding, tags)
+
+        CACHE_OPERATIONS.labels(self.__get_family(key), 'miss' if result is None else 'hit').inc()
+
+        if result is None:
+            result = await self.__load_once(key, loader)
+
+            if encoding is not None and result != NOT_FOUND:
+                encoded, _, encoded_with = await self.__read(key, encoding)
+
+                if encoded is not None:
+                    result, result_encoding = encoded, encoded_with
+        elif not fresh:
+            await self.__refresh(key, loader)
+
+        if conditional is not None:
+            conditional.state.etag = self.__etag(key, result_encoding)
+
+        return None if result == NOT_FOUND else result, result_encoding
+
+    async def delete(self, *keys: str) -> None:
+        await self.invalidate(*keys)
+
+    async def patch(self, keys: Collection[str], load_patches: PatchesLoader, indexes: Collection[str] = ()) -> None:
+        """Replaces the cached payloads of the keys with the results of their patchers, under new versions"""
+        if (dropped := await self.__patch(keys, load_patches, indexes)) is None:
+            await self.delete(*keys)
+
+            return
+
+        for key in dropped:
+            CACHE_OPERATIONS.labels(self.__get_family(key), 'delete').inc()
+
+        await self.__bump_after_replica([self.__version_key(key) for key in dropped])
+
+    async def write_through(self, key: str, loader: Callable[[], Awaitable[bytes | None]]) -> None:
+        """Patches the entity, its cached pages and the catalog with the row returned by the loader under WATCH"""
+        family, *ids = key.split(':')
+        page_family = f'{family}-page'
+
+        if (indexed_keys := await self.get_indexed_keys(page_family, *ids[:-1])) is None:
+            # Too many pages to patch: all of them are dropped with the list scope
+            page_keys = [self.scopes_by_family[page_family][-1].format(*ids[:-1])]
+            indexes = [self.__index_key(page_family, *ids[:-1])]
+        else:
+            page_keys, indexes = indexed_keys, []
+
+        async def load_patches() -> dict[str, Patcher] | None:
+            if (data := await loader()) is None:
+                return None
+
+            item = json.loads(data)
+            patches = {page_key: replace_list_item(item) for page_key in page_keys}
+            patches[key] = lambda _: data
+            patches['catalog'] = patch_catalog(item, *ids)
+
+            return patches
+
+        await self.patch([*page_keys, key, 'catalog'], load_patches, indexes)
+
+    async def get_indexed_keys(self, family: str, *ids: Any) -> list[str] | None:
+        """Returns the keys of the family cached with the parent ids, None if they are too many to be indexed"""
+        members = await self.__session.smembers(self.__index_key(family, *ids))
+
+        if b'' in members:
+            return None
+
+        return [member.decode() for member in members]
+
+    async def invalidate(self, *scopes: str) -> None:
+        """Bumps the versions of the scopes, once more when the replica has replayed the writes"""
+        version_keys = [self.__version_key(scope) for scope in scopes]
+
+        for scope in scopes:
+            CACHE_OPERATIONS.labels(self.__get_family(scope), 'delete').inc()
+
+        await self.__bump_versions(version_keys)
+        await self.__bump_after_replica(version_keys)
+
+    async def __bump_after_replica(self, version_keys: list[str]) -> None:
+        """Bumps the versions once the replica has replayed the write of the current `track_writes` block, if any"""
+        if version_keys and (state := current_write_state.get()) is not None and state.lsn is not None:
+            await wait_for_replica(state.lsn)
+            await self.__bump_versions(version_keys)
+
+    async def __bump_versions(self, version_keys: list[str]) -> None:
+        pipe = self.__session.pipeline(transaction=False)
+
+        async with pipe:
+            for version_key in version_keys:
+                pipe.set(version_key, self.__initial_version(), ex=self.__ttl * 10, nx=True)
+                pipe.incr(version_key)
+                pipe.expire(version_key, self.__ttl * 10)
+
+            await pipe.execute()
+
+        await self.__publish_invalidation(*version_keys)
+
+    async def __lookup(
+            self,
+            key: str,
+            encoding: str | None,
+            tags: set[str]
+    ) -> tuple[str, bytes | None, bool, str | None]:
+        """Resolves the versioned key, answers with 304 if it matches the ETags, otherwise reads it like `__read`"""
+        if local_cache.enabled:
+            key, = await self.__resolve_keys(key)
+            self.__check_not_modified(key, tags)
+
+            return key, *await self.__read(key, encoding)
+
+        encodings = [encoding, None] if encoding is not None else [None]
+        variants = self.__get_variant_encodings(key)
+        versioned_key, not_modified, *entry = await self.__session.register_script(READ_SCRIPT)(
+            keys=[self.__version_key(scope) for scope in [key, *self.__get_scopes(key)]],
+            args=[
+                key, self.__initial_version(), self.__ttl * 10, self.__fresh_key('') if self.__soft_ttl else '',
+                len(encodings), *(self.__variant_key('', entry_encoding) for entry_encoding in encodings),
+                len(variants), *(self.__variant_key('', variant) for variant in variants),
+                *tags,
+            ],
+        )
+        key = versioned_key.decode()
+
+        if not_modified:
+            self.__check_not_modified(key, tags)
+
+        index, result, fresh = entry
+
+        return key, result, bool(fresh), encodings[index - 1] if index else None
+
+    async def __read(self, key: str, encoding: str | None = None) -> tuple[bytes | None, bool, str | None]:
+        """Returns the cached payload, preferably its compressed variant, its freshness and its encoding"""
+        entries = self.__get_read_entries(key, encoding)
+
+        if local_cache.enabled:
+            for entry_key, entry_encoding in entries:
+                if (result := local_cache.get(entry_key)) is not None:
+                    return result, True, entry_encoding
+
+        entry_keys = [entry_key for entry_key, _ in entries]
+        values = await self.__session.mget(*entry_keys) if len(entry_keys) > 1 else [await self.__session.get(key)]
+
+        return self.__pick(entries, values)
+
+    def __get_read_entries(self, key: str, encoding: str | None) -> list[tuple[str, str | None]]:
+        """Returns the (key, encoding) entries to read, in the order of preference, then the freshness mark if any"""
+        entries: list[tuple[str, str | None]] = [(key, None)]
+
+        if encoding is not None:
+            entries.insert(0, (self.__variant_key(key, encoding), encoding))
+
+        if self.__soft_ttl:
+            entries.append((self.__fresh_key(key), None))
+
+        return entries
+
+    def __pick(
+            self,
+            entries: list[tuple[str, str | None]],
+            values: list[bytes | None]
+    ) -> tuple[bytes | None, bool, str | None]:
+        fresh = True
+
+        if self.__soft_ttl:
+            *entries, _ = entries
+            *values, fresh_mark = values
+            fresh = fresh_mark is not None
+
+        for (entry_key, entry_encoding), result in zip(entries, values):
+            if result is not None:
+                if local_cache.enabled and fresh:
+                    local_cache.set(entry_key, result, len(result))
+
+                return result, fresh, entry_encoding
+
+        return None, fresh, None
+
+    async def __write(self, key: str, data: bytes | None) -> None:
+        entries = await self.__get_entries(key, data)
+
+        pipe = self.__session.pipeline(transaction=False)
+
+        async with pipe:
+            await self.__queue_write(pipe, key, entries)
+
+            await pipe.execute()
+
+        self.__written(key, entries)
+
+    async def __patch(
+            self,
+            keys: Collection[str],
+            load_patches: PatchesLoader,
+            indexes: Collection[str]
+    ) -> list[str] | None:
+        """Patches the entries unless their versions change meanwhile, returns the dropped keys"""
+        scopes = {key: [key, *self.__get_scopes(key)] for key in keys}
+        all_scopes = list({scope for key_scopes in scopes.values() for scope in key_scopes})
+        version_keys = [self.__version_key(scope) for scope in all_scopes]
+        # Initialized beforehand, so that the watched versions exist
+        await self.__get_versions(all_scopes)
+
+        pipe = self.__session.pipeline(transaction=True)
+
+        async with pipe:
+            await pipe.watch(*version_keys)
+
+            if (patches := await load_patches()) is None:
+                return None
+
+            stored = await pipe.mget(*version_keys)
+
+            if None in stored:
+                return None
+
+            versions = {scope: int(version) for scope, version in zip(all_scopes, stored)}
+            current = [self.__versioned_key(key, key_scopes, versions) for key, key_scopes in scopes.items()]
+            payloads = await pipe.mget(*current)
+            writes, dropped = {}, []
+
+            for (key, key_scopes), payload in zip(scopes.items(), payloads):
+                patcher = patches.get(key)
+                data = None if patcher is None else patcher(None if payload in (None, NOT_FOUND) else payload)
+
+                if data is None:
+                    dropped.append(key)
+                else:
+                    new_key = self.__versioned_key(key, key_scopes, {**versions, key: versions[key] + 1})
+                    writes[new_key] = await self.__get_entries(new_key, data)
+
+            pipe.multi()
+
+            for key in keys:
+                pipe.incr(self.__version_key(key))
+                pipe.expire(self.__version_key(key), self.__ttl * 10)
+
+            for new_key, entries in writes.items():
+                await self.__queue_write(pipe, new_key, entries)
+
+            for key in dropped:
+                if (index_key := self.__get_index_key(key)) is not None:
+                    pipe.srem(index_key, key)
+
+            if indexes:
+                pipe.delete(*indexes)
+
+            try:
+                await pipe.execute()
+            except WatchError:
+                return None
+
+        for new_key, entries in writes.items():
+            self.__written(new_key, entries)
+
+        await self.__publish_invalidation(*(self.__version_key(key) for key in keys))
+
+        return dropped
+
+    async def __get_entries(self, key: str, data: bytes | None) -> list[tuple[str, int, bytes]]:
+        """Returns the (key, ttl, value) entries caching the payload: the payload, its variants and freshness mark"""
+        ttl, soft_ttl = self.__ttl, self.__soft_ttl
+
+        variants = {}
+
+        if data is None:
+            data = NOT_FOUND
+            ttl, soft_ttl = CACHE_NEGATIVE_TTL, min(soft_ttl, CACHE_NEGATIVE_TTL)
+        elif self.__get_family(key) in self.compressed_families and len(data) >= CACHE_COMPRESSION_MIN_SIZE:
+            variants = await asyncio.to_thread(compress, data)
+
+        entries = [(key, ttl, data)]
+        entries.extend((self.__variant_key(key, encoding), ttl, variant) for encoding, variant in variants.items())
+
+        if soft_ttl:
+            entries.append((self.__fresh_key(key), soft_ttl, b'1'))
+
+        return entries
+
+    async def __queue_write(
+            self,
+            pipe: redis.client.Pipeline,
+            key: str,
+            entries: list[tuple[str, int, bytes]]
+    ) -> None:
+        for entry_key, ttl, value in entries:
+            pipe.setex(entry_key, ttl, value)
+
+        _, _, data = entries[0]
+
+        # An empty page has no row to patch
+        if (index_key := self.__get_index_key(key)) is not None and data != b'[]':
+            await self.__session.register_script(INDEX_SCRIPT)(
+                keys=[index_key], args=[key.partition('@')[0], self.__ttl * 10, CACHE_INDEX_MAX_KEYS], client=pipe
+            )
+
+    def __get_index_key(self, key: str) -> str | None:
+        family, *ids = key.partition('@')[0].split(':')
+
+        if family not in self.indexed_families:
+            return None
+
+        return self.__index_key(family, *ids[:self.indexed_families[family]])
+
+    def __written(self, key: str, entries: list[tuple[str, int, bytes]]) -> None:
+        _, _, data = entries[0]
+
+        CACHE_OPERATIONS.labels(self.__get_family(key), 'set').inc()
+
+        if local_cache.enabled:
+            local_cache.set(key, data, len(data))
+
+    async def __load_once(self, key: str, loader: Callable[[], Awaitable[bytes | None]]) -> bytes | None:
+        """Runs a single loader per key in the process, sharing its result with concurrent callers"""
+        task = inflight_loads.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(self.__load_locked(key, loader))
+            inflight_loads[key] = task
+            task.add_done_callback(lambda _: inflight_loads.pop(key, None))
+
+        return await asyncio.shield(task)
+
+    async def __load_locked(self, key: str, loader: Callable[[], Awaitable[bytes | None]]) -> bytes | None:
+        """Loads the payload under a Redis lock, or waits for the process holding it to cache the payload"""
+        lock = self.__session.lock(self.__lock_key(key), timeout=CACHE_LOCK_TTL)
+
+        if not await lock.acquire(blocking=False):
+            deadline = time.monotonic() + CACHE_LOCK_WAIT
+
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+
+                if (result := await self.__session.get(key)) is not None:
+                    return result
+
+                if not await lock.locked():
+                    break
+
+        try:
+            result = await loader()
+
+            await self.__write(key, result)
+        finally:
+            with contextlib.suppress(LockError):
+                await lock.release()
+
+        return result
+
+    async def __refresh(self, key: str, loader: Callable[[], Awaitable[bytes | None]]) -> None:
+        """Schedules a single refresh of a stale entry across the processes"""
+        lock = self.__session.lock(self.__lock_key(key), timeout=CACHE_LOCK_TTL)
+
+        if key in inflight_loads or not await lock.acquire(blocking=False):
+            return
+
+        async def refresh() -> None:
+            try:
+                await self.__write(key, await loader())
+            finally:
+                with contextlib.suppress(LockError):
+                    await lock.release()
+
+        if self.__bg_tasks is None:
+            await refresh()
+        else:
+            self.__bg_tasks.add_task(refresh)
+
+    @staticmethod
+    def __get_if_none_match(request: Request) -> set[str]:
+        if_none_match = request.headers.get('if-none-match')
+
+        return {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')} if if_none_match else set()
+
+    def __check_not_modified(self, key: str, tags: set[str]) -> None:
+        """Answers with 304 if the client has any variant of the current version of the payload"""
+        for encoding in self.__get_variant_encodings(key):
+            if (etag := self.__etag(key, encoding)) in tags:
+                CACHE_OPERATIONS.labels(self.__get_family(key), 'not_modified').inc()
+
+                raise HTTPException(status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    def __get_variant_encodings(self, key: str) -> list[str | None]:
+        return [None, *COMPRESSORS] if self.__get_family(key) in self.compressed_families else [None]
+
+    def __etag(self, key: str, encoding: str | None) -> str:
+        # SHA-1, like the ETags compared by READ_SCRIPT
+        return f'"{hashlib.sha1(self.__variant_key(key, encoding).encode()).hexdigest()}"'
+
+    async def __resolve_keys(self, *keys: str) -> list[str]:
+        scopes = {key: [key, *self.__get_scopes(key)] for key in keys}
+        versions = await self.__get_versions({scope for key_scopes in scopes.values() for scope in key_scopes})
+        result = [self.__versioned_key(key, key_scopes, versions) for key, key_scopes in scopes.items()]
+
+        return result
+
+    @staticmethod
+    def __versioned_key(key: str, scopes: list[str], versions: dict[str, int]) -> str:
+        return f'{key}@{".".join(str(versions[scope]) for scope in scopes)}'
+
+    async def __get_versions(self, scopes: Collection[str]) -> dict[str, int]:
+        versions = {}
+
+        if local_cache.enabled:
+            versions = {
+                scope: version for scope in scopes
+                if (version := local_cache.get(self.__version_key(scope))) is not None
+            }
+
+        missing = [scope for scope in scopes if scope not in versions]
+
+        if missing:
+            stored = await self.__session.mget([self.__version_key(scope) for scope in missing])
+            unset = [scope for scope, version in zip(missing, stored) if version is None]
+
+            if unset:
+                initialized = dict(zip(unset, await self.__init_versions(unset)))
+                stored = [initialized.get(scope, version) for scope, version in zip(missing, stored)]
+
+            for scope, version in zip(missing, stored):
+                # Set by `__init_versions` if it was missing
+                versions[scope] = int(cast(bytes, version))
+
+                if local_cache.enabled:
+                    local_cache.set(self.__version_key(scope), versions[scope], 1)
+
+        return versions
+
+    async def __init_versions(self, scopes: list[str]) -> list[bytes]:
+        """Sets the missing versions of the scopes, returning the versions set by this or another process"""
+        pipe = self.__session.pipeline(transaction=False)
+
+        async with pipe:
+            for scope in scopes:
+                pipe.set(self.__version_key(scope), self.__initial_version(), ex=self.__ttl * 10, nx=True)
+                pipe.get(self.__version_key(scope))
+
+            result = await pipe.execute()
+
+        return result[1::2]
+
+    async def __publish_invalidation(self, *keys: str) -> None:
+        local_cache.delete(*keys)
+
+        await self.__session.publish(CACHE_INVALIDATION_CHANNEL, json.dumps(keys))
+
+    def __get_scopes(self, key: str) -> list[str]:
+        family, *ids = key.split(':')
+
+        return [template.format(*ids) for template in self.scopes_by_family.get(family, ())]
+
+    @staticmethod
+    def __get_family(key: str) -> str:
+        return key.partition('@')[0].partition(':')[0]
+
+    @staticmethod
+    def __variant_key(key: str, encoding: str | None) -> str:
+        return key if encoding is None else f'{key}#{encoding}'
+
+    @staticmethod
+    def __initial_version() -> int:
+        """Starts the versions from the clock, so that a version lost with Redis is never issued again"""
+        return time.time_ns() // 1000
+
+    @staticmethod
+    def __version_key(scope: str) -> str:
+        return f'version:{scope}'
+
+    @staticmethod
+    def __fresh_key(key: str) -> str:
+        return f'{key}#fresh'
+
+    @staticmethod
+    def __index_key(family: str, *ids: Any) -> str:
+        return ':'.join(['index', family, *map(str, ids)])
+
+    @staticmethod
+    def __lock_key(key: str) -> str:
+        return f'lock:{key}'
+
+
+def compress(data: bytes) -> dict[str, bytes]:
+    return {encoding: compressor(data) for encoding, compressor in COMPRESSORS.items()}
+
+
+def get_cache(
+        background_tasks: BackgroundTasks,
+        request: Request,
+        session: redis.Redis = Depends(get_redis_session)
+) -> RedisCache:
+    """Returns the cache used by the request, refreshing the stale entries after the response"""
+    return RedisCache(session, background_tasks, request)
+
+
+def dump_json(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def replace_list_item(item: dict[str, Any]) -> Patcher:
+    """Returns the patcher replacing the element with the id of the item in a cached JSON list"""
+    def patcher(data: bytes | None) -> bytes | None:
+        if data is None:
+            return None
+
+        items = json.loads(data)
+
+        for i, element in enumerate(items):
+            if element['id'] == item['id']:
+                items[i] = item
+
+                return dump_json(items)
+
+        return data
+
+    return patcher
+
+
+def patch_catalog(fields: dict[str, Any], *path: Any) -> Patcher:
+    """Returns the patcher of the element at the path of ids in the cached catalog"""
+    def patcher(data: bytes | None) -> bytes | None:
+        if data is None:
+            return None
+
+        catalog = elements = json.loads(data)
+        element = None
+
+        for depth, element_id in enumerate(path):
+            element = next((element for element in elements or () if element['id'] == str(element_id)), None)
+
+            if element is None:
+                return None
+
+            if depth < len(path) - 1:
+                elements = element[CATALOG_CHILDREN[depth]]
+
+        if element is None:
+            return None
+
+        element.update((name, fields[name]) for name in element if name in fields)
 
-        await self.__session.setex(key, self.__ttl, data)
+        return dump_json(catalog)
 
-    async def delete(self, *patterns: str) -> None:
-        for pattern in patterns:
-            async for key in self.__session.scan_iter(pattern):
-                await self.__session.delete(key)
+    return patcher
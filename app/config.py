@@ -4,16 +4,39 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-XLSX_PATH = 'admin/Menu.xlsx'
+XLSX_PATH = os.environ.get('XLSX_PATH', 'admin/Menu.xlsx')
+CATALOG_ENGINE = os.environ.get('CATALOG_ENGINE', 'sql')
+PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 100))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 1000))
+SYNC_BATCH_SIZE = int(os.environ.get('SYNC_BATCH_SIZE', 1000))
+SYNC_INTERVAL = float(os.environ.get('SYNC_INTERVAL', 15))
+SYNC_LOCK_TTL = float(os.environ.get('SYNC_LOCK_TTL', 60))
 
 PG_HOST = os.environ.get('POSTGRES_HOST')
 PG_USER = os.environ.get('POSTGRES_USER')
 PG_PASSWORD = os.environ.get('POSTGRES_PASSWORD')
 PG_DB = os.environ.get('POSTGRES_DB')
 PG_PORT = os.environ.get('POSTGRES_PORT')
+PG_POOL_SIZE = int(os.environ.get('POSTGRES_POOL_SIZE', 10))
+PG_MAX_OVERFLOW = int(os.environ.get('POSTGRES_MAX_OVERFLOW', 10))
+PG_POOL_RECYCLE = int(os.environ.get('POSTGRES_POOL_RECYCLE', 1800))
+PG_POOL_PRE_PING = os.environ.get('POSTGRES_POOL_PRE_PING', 'true').lower() == 'true'
+PG_STATEMENT_TIMEOUT = int(os.environ.get('POSTGRES_STATEMENT_TIMEOUT', 30000))
+PG_ECHO = os.environ.get('POSTGRES_ECHO', 'false').lower() == 'true'
+PG_SLOW_STATEMENT_THRESHOLD = int(os.environ.get('POSTGRES_SLOW_STATEMENT_THRESHOLD', 100))
+PG_REPLICA_HOST = os.environ.get('POSTGRES_REPLICA_HOST')
+PG_REPLICA_PORT = os.environ.get('POSTGRES_REPLICA_PORT', PG_PORT)
+PG_REPLICA_WAIT = float(os.environ.get('POSTGRES_REPLICA_WAIT', 5))
+# Signs the consistency tokens, shared by all the workers and unknown to the clients
+CONSISTENCY_TOKEN_SECRET = os.environ.get('CONSISTENCY_TOKEN_SECRET', PG_PASSWORD or '')
 
 REDIS_HOST = os.environ.get('REDIS_HOST')
 REDIS_PORT = os.environ.get('REDIS_PORT')
+REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 50))
+REDIS_POOL_TIMEOUT = float(os.environ.get('REDIS_POOL_TIMEOUT', 5))
+REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT', 5))
+REDIS_SOCKET_CONNECT_TIMEOUT = float(os.environ.get('REDIS_SOCKET_CONNECT_TIMEOUT', 5))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.environ.get('REDIS_HEALTH_CHECK_INTERVAL', 30))
 
 RMQ_HOST = os.environ.get('RABBITMQ_HOST')
 RMQ_USER = os.environ.get('RABBITMQ_USER')
@@ -28,3 +51,21 @@ DB_PORT_TEST = os.environ.get('DB_PORT_TEST')
 
 REDIS_HOST_TEST = os.environ.get('REDIS_HOST_TEST')
 REDIS_PORT_TEST = os.environ.get('REDIS_PORT_TEST')
+
+CACHE_TTL = int(os.environ.get('CACHE_TTL', 700))
+CACHE_NEGATIVE_TTL = int(os.environ.get('CACHE_NEGATIVE_TTL', 60))
+CACHE_SOFT_TTL = int(os.environ.get('CACHE_SOFT_TTL', 0))
+CACHE_LOCK_TTL = float(os.environ.get('CACHE_LOCK_TTL', 10))
+CACHE_LOCK_WAIT = float(os.environ.get('CACHE_LOCK_WAIT', 5))
+CACHE_L1_MAX_ITEMS = int(os.environ.get('CACHE_L1_MAX_ITEMS', 1024))
+CACHE_L1_MAX_BYTES = int(os.environ.get('CACHE_L1_MAX_BYTES', 32 * 1024 * 1024))
+CACHE_L1_TTL = float(os.environ.get('CACHE_L1_TTL', 30))
+CACHE_L1_ENABLED = os.environ.get('CACHE_L1_ENABLED', 'false').lower() == 'true'
+CACHE_INVALIDATION_CHANNEL = os.environ.get('CACHE_INVALIDATION_CHANNEL', 'cache:invalidate')
+CACHE_COMPRESSION_MIN_SIZE = int(os.environ.get('CACHE_COMPRESSION_MIN_SIZE', 1024))
+CACHE_GZIP_LEVEL = int(os.environ.get('CACHE_GZIP_LEVEL', 6))
+CACHE_BROTLI_LEVEL = int(os.environ.get('CACHE_BROTLI_LEVEL', 6))
+CACHE_WRITE_THROUGH = os.environ.get('CACHE_WRITE_THROUGH', 'true').lower() == 'true'
+CACHE_INDEX_MAX_KEYS = int(os.environ.get('CACHE_INDEX_MAX_KEYS', 64))
+CACHE_WARMUP = os.environ.get('CACHE_WARMUP', 'background').lower()
+CACHE_WARMUP_CONCURRENCY = int(os.environ.get('CACHE_WARMUP_CONCURRENCY', 4))
@@ -0,0 +1,132 @@
+import argparse
+import asyncio
+from typing import Any
+
+from sqlalchemy import DDL, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import close_async_engine, get_async_session_cm
+
+COUNTERS_DDL = (
+    DDL("""
+        CREATE OR REPLACE FUNCTION submenu_counters() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                UPDATE menu
+                SET submenus_count = submenus_count - 1, dishes_count = dishes_count - OLD.dishes_count
+                WHERE id = OLD.menu_id;
+            END IF;
+
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE menu
+                SET submenus_count = submenus_count + 1, dishes_count = dishes_count + NEW.dishes_count
+                WHERE id = NEW.menu_id;
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """),
+    DDL("""
+        CREATE OR REPLACE FUNCTION dish_counters() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                WITH updated AS (
+                    UPDATE submenu SET dishes_count = dishes_count - 1 WHERE id = OLD.submenu_id RETURNING menu_id
+                )
+                UPDATE menu SET dishes_count = dishes_count - 1 WHERE id IN (SELECT menu_id FROM updated);
+            END IF;
+
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                WITH updated AS (
+                    UPDATE submenu SET dishes_count = dishes_count + 1 WHERE id = NEW.submenu_id RETURNING menu_id
+                )
+                UPDATE menu SET dishes_count = dishes_count + 1 WHERE id IN (SELECT menu_id FROM updated);
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """),
+    DDL("""
+        CREATE TRIGGER submenu_counters AFTER INSERT OR DELETE ON submenu
+        FOR EACH ROW EXECUTE FUNCTION submenu_counters()
+    """),
+    DDL("""
+        CREATE TRIGGER submenu_counters_move AFTER UPDATE OF menu_id ON submenu
+        FOR EACH ROW WHEN (OLD.menu_id IS DISTINCT FROM NEW.menu_id) EXECUTE FUNCTION submenu_counters()
+    """),
+    DDL("""
+        CREATE TRIGGER dish_counters AFTER INSERT OR DELETE ON dish
+        FOR EACH ROW EXECUTE FUNCTION dish_counters()
+    """),
+    DDL("""
+        CREATE TRIGGER dish_counters_move AFTER UPDATE OF submenu_id ON dish
+        FOR EACH ROW WHEN (OLD.submenu_id IS DISTINCT FROM NEW.submenu_id) EXECUTE FUNCTION dish_counters()
+    """),
+)
+
+BACKFILL_SQL = (
+    text("""
+        UPDATE submenu
+        SET dishes_count = (SELECT count(*) FROM dish WHERE dish.submenu_id = submenu.id)
+    """),
+    text("""
+        UPDATE menu
+        SET submenus_count = (SELECT count(*) FROM submenu WHERE submenu.menu_id = menu.id),
+            dishes_count = (SELECT coalesce(sum(dishes_count), 0) FROM submenu WHERE submenu.menu_id = menu.id)
+    """),
+)
+
+CHECK_SQL = text("""
+    SELECT 'submenu' AS table_name, submenu.id, submenu.dishes_count AS stored, count(dish.id) AS actual
+    FROM submenu LEFT JOIN dish ON dish.submenu_id = submenu.id
+    GROUP BY submenu.id
+    HAVING submenu.dishes_count <> count(dish.id)
+    UNION ALL
+    SELECT 'menu', menu.id, menu.submenus_count, count(submenu.id)
+    FROM menu LEFT JOIN submenu ON submenu.menu_id = menu.id
+    GROUP BY menu.id
+    HAVING menu.submenus_count <> count(submenu.id)
+    UNION ALL
+    SELECT 'menu', menu.id, menu.dishes_count, count(dish.id)
+    FROM menu LEFT JOIN submenu ON submenu.menu_id = menu.id LEFT JOIN dish ON dish.submenu_id = submenu.id
+    GROUP BY menu.id
+    HAVING menu.dishes_count <> count(dish.id)
+""")
+
+
+async def backfill_counters(session: AsyncSession) -> None:
+    for statement in BACKFILL_SQL:
+        await session.execute(statement)
+
+    await session.commit()
+
+
+async def check_counters(session: AsyncSession) -> list[dict[str, Any]]:
+    """Returns the rows whose stored counters differ from the actual ones"""
+    result = await session.execute(CHECK_SQL)
+
+    return [dict(row) for row in result.mappings()]
+
+
+async def main(command: str) -> int:
+    async with get_async_session_cm() as session:
+        if command == 'backfill':
+            await backfill_counters(session)
+
+        mismatches = await check_counters(session)
+
+    await close_async_engine()
+
+    for mismatch in mismatches:
+        print('{table_name} {id}: stored {stored}, actual {actual}'.format(**mismatch))
+
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=['check', 'backfill'])
+
+    raise SystemExit(asyncio.run(main(parser.parse_args().command)))
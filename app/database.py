@@ -1,41 +1,303 @@
+import asyncio
 import contextlib
-from typing import AsyncIterator
+import contextvars
+import dataclasses
+import hashlib
+import hmac
+import time
+from typing import Any, AsyncIterator, Iterator
 
 import redis.asyncio as redis
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import Select, text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session
+from starlette.requests import Request
 
 from app.config import (
+    CONSISTENCY_TOKEN_SECRET,
     PG_DB,
+    PG_ECHO,
     PG_HOST,
+    PG_MAX_OVERFLOW,
     PG_PASSWORD,
+    PG_POOL_PRE_PING,
+    PG_POOL_RECYCLE,
+    PG_POOL_SIZE,
     PG_PORT,
+    PG_REPLICA_HOST,
+    PG_REPLICA_PORT,
+    PG_REPLICA_WAIT,
+    PG_STATEMENT_TIMEOUT,
     PG_USER,
+    REDIS_HEALTH_CHECK_INTERVAL,
     REDIS_HOST,
+    REDIS_MAX_CONNECTIONS,
+    REDIS_POOL_TIMEOUT,
     REDIS_PORT,
+    REDIS_SOCKET_CONNECT_TIMEOUT,
+    REDIS_SOCKET_TIMEOUT,
 )
+from app.metrics import instrument_engine
 
 DATABASE_URL_ASYNC = f'postgresql+asyncpg://{PG_USER}:{PG_PASSWORD}@{PG_HOST}:{PG_PORT}/{PG_DB}'
+REPLICA_URL_ASYNC = f'postgresql+asyncpg://{PG_USER}:{PG_PASSWORD}@{PG_REPLICA_HOST}:{PG_REPLICA_PORT}/{PG_DB}'
 REDIS_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}'
 
-async_engine = create_async_engine(DATABASE_URL_ASYNC, echo=True)
+# Sent back by the clients to read their own writes, see `get_async_session`
+CONSISTENCY_TOKEN_HEADER = 'X-Consistency-Token'
+
+async_engine: AsyncEngine | None = None
+replica_engine: AsyncEngine | None = None
+async_session_factory: async_sessionmaker[AsyncSession] | None = None
+redis_client: redis.Redis | None = None
+
+# The highest WAL position known to be replayed by the replica
+replica_lsn = 0
+
+
+class RoutingSession(Session):
+    """Session sending its reads to the replica, if any, until it writes"""
+
+    def get_bind(self, mapper=None, *, clause=None, **kwargs: Any):
+        replica = self.info.get('replica')
+
+        if replica is not None and not self.info.get('primary'):
+            if isinstance(clause, Select) and not self._flushing:
+                return replica
+
+            self.info['primary'] = True
+
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+@dataclasses.dataclass
+class WriteState:
+    """WAL position of the primary after the last write committed within a `track_writes` block"""
+    lsn: str | None = None
+
+
+current_write_state: contextvars.ContextVar[WriteState | None] = contextvars.ContextVar(
+    'current_write_state', default=None
+)
+
+
+def get_async_engine() -> AsyncEngine:
+    """Returns the process-wide engine, creating it on first use"""
+    global async_engine
+
+    if async_engine is None:
+        async_engine = _create_engine(DATABASE_URL_ASYNC)
+        instrument_engine(async_engine)
+
+    return async_engine
+
+
+def get_replica_engine() -> AsyncEngine | None:
+    """Returns the process-wide engine of the read replica, unless no replica is configured"""
+    global replica_engine
+
+    if replica_engine is None and PG_REPLICA_HOST:
+        replica_engine = _create_engine(REPLICA_URL_ASYNC)
+        instrument_engine(replica_engine, report_pool=False)
+
+    return replica_engine
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        echo=PG_ECHO,
+        pool_size=PG_POOL_SIZE,
+        max_overflow=PG_MAX_OVERFLOW,
+        pool_recycle=PG_POOL_RECYCLE,
+        pool_pre_ping=PG_POOL_PRE_PING,
+        connect_args={'server_settings': {'statement_timeout': str(PG_STATEMENT_TIMEOUT)}},
+    )
+
+
+def get_async_session_factory() -> async_sessionmaker[AsyncSession]:
+    global async_session_factory
+
+    if async_session_factory is None:
+        replica = get_replica_engine()
+        async_session_factory = async_sessionmaker(
+            get_async_engine(),
+            sync_session_class=RoutingSession,
+            info={'replica': None if replica is None else replica.sync_engine},
+        )
+
+    return async_session_factory
+
+
+async def close_async_engine() -> None:
+    global async_engine, replica_engine, async_session_factory
+
+    if async_engine is not None:
+        await async_engine.dispose()
+
+        async_engine = None
+        async_session_factory = None
+
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
+        replica_engine = None
+
+
+def parse_lsn(lsn: str) -> int:
+    """Returns the WAL position written as `XXXXXXXX/XXXXXXXX` as a number"""
+    high, low = lsn.split('/')
+
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+async def replica_has_replayed(lsn: str) -> bool:
+    """Returns whether the replica, if any, has replayed the WAL up to the position"""
+    global replica_lsn
+
+    replica = get_replica_engine()
+
+    try:
+        position = parse_lsn(lsn)
+    except ValueError:
+        return True
+
+    if replica is None or position <= replica_lsn:
+        return True
+
+    async with replica.connect() as conn:
+        replayed = (await conn.execute(text('SELECT pg_last_wal_replay_lsn()::text'))).scalar()
+
+    if replayed is None:
+        # Not a standby server
+        return True
+
+    replica_lsn = max(replica_lsn, parse_lsn(replayed))
+
+    return position <= replica_lsn
+
+
+async def wait_for_replica(lsn: str, timeout: float = PG_REPLICA_WAIT) -> bool:
+    """Waits for the replica to replay the WAL up to the position, returns False on timeout"""
+    deadline = time.monotonic() + timeout
+
+    while not await replica_has_replayed(lsn):
+        if time.monotonic() >= deadline:
+            return False
+
+        await asyncio.sleep(0.05)
+
+    return True
+
+
+def issue_consistency_token(lsn: str) -> str:
+    """Returns the signed consistency token of the WAL position, valid for PG_REPLICA_WAIT seconds"""
+    payload = f'{lsn}:{int(time.time() * 1000)}'
+
+    return f'{payload}:{_sign(payload)}'
+
+
+def read_consistency_token(token: str) -> str | None:
+    """Returns the WAL position of the token, None if it is forged or expired"""
+    payload, _, signature = token.rpartition(':')
+    lsn, _, issued = payload.rpartition(':')
+
+    if not hmac.compare_digest(signature, _sign(payload)) or not issued.isdigit():
+        return None
+
+    if time.time() - int(issued) / 1000 > PG_REPLICA_WAIT:
+        return None
+
+    return lsn
+
+
+def _sign(payload: str) -> str:
+    return hmac.new(CONSISTENCY_TOKEN_SECRET.encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+
+async def has_pending_write(request: Request) -> bool:
+    """Returns whether the client sent the consistency token of a write the replica has not replayed yet"""
+    if not hasattr(request.state, 'pending_write'):
+        lsn = read_consistency_token(request.headers.get(CONSISTENCY_TOKEN_HEADER, ''))
+        request.state.pending_write = lsn is not None and not await replica_has_replayed(lsn)
+
+    return request.state.pending_write
+
+
+@contextlib.contextmanager
+def track_writes() -> Iterator[WriteState]:
+    """Collects the WAL position of the writes committed by the current task within the block"""
+    state = WriteState()
+    token = current_write_state.set(state)
+
+    try:
+        yield state
+    finally:
+        current_write_state.reset(token)
+
+
+async def remember_write(session: AsyncSession) -> None:
+    """Records the WAL position of the primary after the session committed a write, if a replica is configured"""
+    state = current_write_state.get()
+
+    if state is None or get_replica_engine() is None:
+        return
+
+    state.lsn = (await session.execute(text('SELECT pg_current_wal_lsn()::text'))).scalar()
+
+
+def get_redis_client() -> redis.Redis:
+    """Returns the process-wide Redis client, creating its connection pool on first use"""
+    global redis_client
+
+    if redis_client is None:
+        pool = redis.BlockingConnectionPool.from_url(
+            REDIS_URL,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            timeout=REDIS_POOL_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_SOCKET_CONNECT_TIMEOUT,
+            health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+        )
+        redis_client = redis.Redis(connection_pool=pool)
+
+    return redis_client
+
+
+async def close_redis_client() -> None:
+    global redis_client
+
+    if redis_client is not None:
+        await redis_client.close(close_connection_pool=True)
+
+        redis_client = None
 
 
 @contextlib.asynccontextmanager
-async def get_async_session_cm() -> AsyncSession:
-    async_session = async_sessionmaker(async_engine)
+async def get_async_session_cm() -> AsyncIterator[AsyncSession]:
+    """Returns a session bound to the primary only, for the work done outside of requests"""
+    async with get_async_session_factory()() as session:
+        session.info['primary'] = True
 
-    async with async_session() as session:
         yield session
 
 
 @contextlib.asynccontextmanager
 async def get_redis_session_cm() -> AsyncIterator[redis.Redis]:
-    async with redis.from_url(REDIS_URL) as session:
-        yield session
+    yield get_redis_client()
+
 
+async def get_async_session(request: Request) -> AsyncIterator[AsyncSession]:
+    """Returns a session reading from the replica, if any, unless the client has to read its own writes"""
+    async with get_async_session_factory()() as session:
+        if await has_pending_write(request):
+            session.info['primary'] = True
 
-async def get_async_session() -> AsyncSession:
-    async with get_async_session_cm() as session:
         yield session
 
 
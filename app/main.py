@@ -1,8 +1,56 @@
+import asyncio
+import contextlib
+from typing import AsyncIterator
+
 from fastapi import APIRouter, FastAPI
 
-from app.routers import catalog, dishes, menus, submenus
+from app.cache import invalidation_listener
+from app.config import CACHE_L1_ENABLED, CACHE_WARMUP
+from app.database import (
+    close_async_engine,
+    close_redis_client,
+    get_async_session_factory,
+    get_redis_client,
+)
+from app.metrics import MetricsMiddleware
+from app.routers import catalog, dishes, menus, metrics, submenus
+from app.services.warmup import warm_up_cache
+from app.utils import ConsistencyTokenMiddleware, ETagMiddleware
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    get_async_session_factory()
+    get_redis_client()
+
+    if CACHE_L1_ENABLED:
+        await invalidation_listener.start()
+
+    # CACHE_WARMUP is `background`, `blocking` (before serving) or `off`
+    warmup = None
+
+    if CACHE_WARMUP == 'blocking':
+        await warm_up_cache()
+    elif CACHE_WARMUP == 'background':
+        warmup = asyncio.create_task(warm_up_cache())
+
+    yield
+
+    if warmup is not None:
+        warmup.cancel()
+
+        with contextlib.suppress(asyncio.CancelledError):
+            await warmup
+
+    await invalidation_listener.stop()
+    await close_async_engine()
+    await close_redis_client()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(ETagMiddleware)
+app.add_middleware(ConsistencyTokenMiddleware)
+app.add_middleware(MetricsMiddleware)
 api_router = APIRouter(prefix='/api/v1')
 
 api_router.include_router(menus.router)
@@ -10,3 +58,4 @@ api_router.include_router(submenus.router)
 api_router.include_router(dishes.router)
 api_router.include_router(catalog.router)
 app.include_router(api_router)
+app.include_router(metrics.router)
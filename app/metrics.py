@@ -0,0 +1,235 @@
+import contextlib
+import contextvars
+import dataclasses
+import json
+import logging
+import os
+import time
+from typing import Any, Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+from prometheus_client.registry import Collector
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Route
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import PG_SLOW_STATEMENT_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Duration of the HTTP requests by route template',
+    ['method', 'route', 'status'], buckets=LATENCY_BUCKETS
+)
+CACHE_OPERATIONS = Counter(
+    'cache_operations_total',
+    'Cache reads (hit, miss, not_modified, bypass), writes (set) and deletions by key family',
+    ['family', 'operation']
+)
+DB_QUERY_DURATION = Histogram(
+    'db_query_duration_seconds', 'Duration of the SQL statements by their kind', ['statement'], buckets=LATENCY_BUCKETS
+)
+SYNC_PHASE_DURATION = Histogram(
+    'sync_phase_duration_seconds', 'Duration of the phases of the spreadsheet sync', ['phase'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+SYNC_ROWS = Counter('sync_rows_total', 'Rows written by the spreadsheet sync', ['entity', 'operation'])
+
+
+@dataclasses.dataclass
+class QueryStats:
+    """Statements run within a `track_queries` block: their count, total duration in seconds and the slow ones"""
+    count: int = 0
+    duration: float = 0.0
+    slow: list[tuple[float, str]] = dataclasses.field(default_factory=list)
+    statements: list[str] | None = None
+
+    def add(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+
+        if duration * 1000 >= PG_SLOW_STATEMENT_THRESHOLD:
+            self.slow.append((duration, statement))
+
+        if self.statements is not None:
+            self.statements.append(statement)
+
+    def merge(self, other: 'QueryStats') -> None:
+        self.count += other.count
+        self.duration += other.duration
+        self.slow.extend(other.slow)
+
+        if self.statements is not None:
+            self.statements.extend(other.statements or ())
+
+
+current_query_stats: contextvars.ContextVar[QueryStats | None] = contextvars.ContextVar(
+    'current_query_stats', default=None
+)
+
+
+class PoolCollector(Collector):
+    """Reports the connections usage of the pool of the instrumented engine at scrape time"""
+
+    def __init__(self):
+        self.engine: AsyncEngine | None = None
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        if self.engine is None or not isinstance(pool := self.engine.pool, QueuePool):
+            return
+
+        gauges = {
+            'size': ('Configured size of the pool', pool.size()),
+            'checked_out': ('Connections in use', pool.checkedout()),
+            'checked_in': ('Idle connections in the pool', pool.checkedin()),
+            'overflow': ('Connections over the pool size, negative while the pool is not filled', pool.overflow()),
+        }
+
+        for name, (documentation, value) in gauges.items():
+            yield GaugeMetricFamily(f'db_pool_{name}', documentation, value=value)
+
+
+pool_collector = PoolCollector()
+REGISTRY.register(pool_collector)
+
+
+def instrument_engine(engine: AsyncEngine, report_pool: bool = True) -> None:
+    """Times every statement of the engine and optionally reports its pool"""
+    event.listen(engine.sync_engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine.sync_engine, 'after_cursor_execute', _after_cursor_execute)
+
+    if report_pool:
+        pool_collector.engine = engine
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    context.query_started_at = time.perf_counter()
+
+
+@contextlib.contextmanager
+def track_queries(keep_statements: bool = False) -> Iterator[QueryStats]:
+    """Collects the statements run by the current task within the block"""
+    parent = current_query_stats.get()
+    keep_statements = keep_statements or (parent is not None and parent.statements is not None)
+    stats = QueryStats(statements=[] if keep_statements else None)
+    token = current_query_stats.set(stats)
+
+    try:
+        yield stats
+    finally:
+        current_query_stats.reset(token)
+
+        if parent is not None:
+            parent.merge(stats)
+
+
+def _after_cursor_execute(conn, cursor, statement: str, parameters, context, executemany) -> None:
+    duration = time.perf_counter() - context.query_started_at
+    kind = statement.lstrip().split(None, 1)[0].upper()
+
+    DB_QUERY_DURATION.labels(kind).observe(duration)
+
+    if (stats := current_query_stats.get()) is not None:
+        stats.add(statement, duration)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Returns the metrics in the Prometheus text format and its content type"""
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    registry.register(pool_collector)
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """Observes the duration and the database time of every HTTP request, labelled with its route"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.__routes: dict[Any, str] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+
+            return
+
+        started_at = time.perf_counter()
+        response_status = 500
+
+        with track_queries() as stats:
+            async def send_with_status(message: Message) -> None:
+                nonlocal response_status
+
+                if message['type'] == 'http.response.start':
+                    response_status = message['status']
+                    MutableHeaders(scope=message).append('Server-Timing', self.__server_timing(stats, started_at))
+
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                duration = time.perf_counter() - started_at
+                route = self.__get_route(scope)
+
+                REQUEST_DURATION.labels(scope['method'], route, response_status).observe(duration)
+                self.__log(scope['method'], route, response_status, duration, stats)
+
+    @staticmethod
+    def __server_timing(stats: QueryStats, started_at: float) -> str:
+        db_duration = stats.duration * 1000
+        total_duration = (time.perf_counter() - started_at) * 1000
+
+        return f'db;dur={db_duration:.1f};desc="{stats.count} queries", total;dur={total_duration:.1f}'
+
+    @staticmethod
+    def __log(method: str, route: str, response_status: int, duration: float, stats: QueryStats) -> None:
+        level = logging.WARNING if stats.slow else logging.INFO
+
+        if not logger.isEnabledFor(level):
+            return
+
+        record = {
+            'method': method,
+            'route': route,
+            'status': response_status,
+            'duration_ms': round(duration * 1000, 1),
+            'db_queries': stats.count,
+            'db_duration_ms': round(stats.duration * 1000, 1),
+            'slow_statements': [
+                {'duration_ms': round(slow_duration * 1000, 1), 'statement': statement}
+                for slow_duration, statement in stats.slow
+            ],
+        }
+
+        logger.log(level, json.dumps(record))
+
+    def __get_route(self, scope: Scope) -> str:
+        endpoint = scope.get('endpoint')
+
+        if endpoint not in self.__routes:
+            self.__routes = {
+                route.endpoint: route.path for route in scope['app'].routes if isinstance(route, Route)
+            }
+            self.__routes.setdefault(endpoint, 'unmatched')
+
+        return self.__routes[endpoint]
@@ -1,26 +1,40 @@
 from __future__ import annotations
 
+import hashlib
 import uuid
 from decimal import Decimal
+from typing import Any, ClassVar
 
-from sqlalchemy import DECIMAL, UUID, ForeignKey, String, func, select
-from sqlalchemy.orm import (
-    DeclarativeBase,
-    Mapped,
-    column_property,
-    mapped_column,
-    relationship,
-)
+from sqlalchemy import DECIMAL, UUID, Computed, ForeignKey, Index, String, event, text
+from sqlalchemy.orm import DeclarativeBase, Mapped, MappedColumn, mapped_column, relationship
+
+from app.counters import COUNTERS_DDL
+
+CONTENT_HASH_SEPARATOR = '\x1f'
+
+
+def content_hash(*values: Any) -> str:
+    """Returns the hash of the values, equal to the `content_hash` computed by the database for the same values"""
+    return hashlib.md5(CONTENT_HASH_SEPARATOR.join(map(str, values)).encode()).hexdigest()
+
+
+def content_hash_column(*names: str) -> MappedColumn[str]:
+    """Column kept by the database equal to the `content_hash` of the text forms of the columns"""
+    expression = f' || chr({ord(CONTENT_HASH_SEPARATOR)}) || '.join(f'{name}::text' for name in names)
+
+    return mapped_column(String(32), Computed(f'md5({expression})', persisted=True))
 
 
 class BaseModel(DeclarativeBase):
     """Base model"""
     id: Mapped[uuid.UUID]
+    content_hash: Mapped[str]
 
 
 class Dish(BaseModel):
     """Dish model"""
     __tablename__ = 'dish'
+    __table_args__ = (Index('ix_dish_submenu_id_id', 'submenu_id', 'id'),)
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title: Mapped[str] = mapped_column(String(100))
@@ -28,11 +42,14 @@ class Dish(BaseModel):
     price: Mapped[Decimal] = mapped_column(DECIMAL(10, 2))
     submenu_id: Mapped[uuid.UUID] = mapped_column(ForeignKey('submenu.id', ondelete='CASCADE'))
     submenu: Mapped[Submenu] = relationship(back_populates='dishes')
+    content_fields: ClassVar[tuple[str, ...]] = ('submenu_id', 'title', 'description', 'price')
+    content_hash: Mapped[str] = content_hash_column(*content_fields)
 
 
 class Submenu(BaseModel):
     """Submenu model"""
     __tablename__ = 'submenu'
+    __table_args__ = (Index('ix_submenu_menu_id_id', 'menu_id', 'id'),)
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title: Mapped[str] = mapped_column(String(50))
@@ -40,9 +57,9 @@ class Submenu(BaseModel):
     menu_id: Mapped[uuid.UUID] = mapped_column(ForeignKey('menu.id', ondelete='CASCADE'))
     menu: Mapped[Menu] = relationship(back_populates='submenus')
     dishes: Mapped[list[Dish]] = relationship(back_populates='submenu', cascade='all, delete')
-    dishes_count: Mapped[int] = column_property(
-        select(func.count(Dish.id)).filter(Dish.submenu_id == id).scalar_subquery()
-    )
+    dishes_count: Mapped[int] = mapped_column(default=0, server_default=text('0'))
+    content_fields: ClassVar[tuple[str, ...]] = ('menu_id', 'title', 'description')
+    content_hash: Mapped[str] = content_hash_column(*content_fields)
 
 
 class Menu(BaseModel):
@@ -53,9 +70,11 @@ class Menu(BaseModel):
     title: Mapped[str] = mapped_column(String(50))
     description: Mapped[str] = mapped_column(String(200))
     submenus: Mapped[list[Submenu]] = relationship(back_populates='menu', cascade='all, delete')
-    submenus_count: Mapped[int] = column_property(
-        select(func.count(Submenu.id)).filter(Submenu.menu_id == id).scalar_subquery()
-    )
-    dishes_count: Mapped[int] = column_property(
-        select(func.coalesce(func.sum(Submenu.dishes_count), 0)).filter(Submenu.menu_id == id).scalar_subquery()
-    )
+    submenus_count: Mapped[int] = mapped_column(default=0, server_default=text('0'))
+    dishes_count: Mapped[int] = mapped_column(default=0, server_default=text('0'))
+    content_fields: ClassVar[tuple[str, ...]] = ('title', 'description')
+    content_hash: Mapped[str] = content_hash_column(*content_fields)
+
+
+for ddl in COUNTERS_DDL:
+    event.listen(Dish.__table__, 'after_create', ddl)
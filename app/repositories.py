@@ -1,14 +1,35 @@
 import abc
 import uuid
-from typing import Generic, TypeVar
+from typing import Any, Collection, Generic, Iterator, Mapping, Sequence, TypeVar
 
 import pydantic
 from fastapi import Depends
-from sqlalchemy import Result, ScalarResult, Select, delete, select, update
+from sqlalchemy import (
+    ColumnElement,
+    Delete,
+    Result,
+    ScalarResult,
+    Select,
+    String,
+    Table,
+    Text,
+    Update,
+    Values,
+    cast,
+    column,
+    delete,
+    func,
+    literal_column,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import Insert, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
-from app.database import get_async_session
+from app.config import SYNC_BATCH_SIZE
+from app.database import get_async_session, remember_write
 from app.models import BaseModel, Dish, Menu, Submenu
 from app.specifications import SpecificationBase
 
@@ -24,12 +45,22 @@ class RepositoryBase(Generic[ModelT], metaclass=abc.ABCMeta):
 
         return result
 
-    async def get_list(self, spec: SpecificationBase | None = None) -> list[ModelT]:
-        query = self._get_select_query()
+    async def get_list(
+            self,
+            spec: SpecificationBase | None = None,
+            limit: int | None = None,
+            after: uuid.UUID | None = None
+    ) -> list[ModelT]:
+        """Returns the rows ordered by id, optionally the page of `limit` rows following the `after` id"""
+        query: Select = self._get_select_query().order_by(self._model_cls.id)
+        query = query.limit(limit)
 
         if spec:
             query = query.where(spec.execute())
 
+        if after:
+            query = query.where(self._model_cls.id > after)
+
         result = (await self._session.execute(query)).scalars()
 
         return [r for r in result]
@@ -39,7 +70,7 @@ class RepositoryBase(Generic[ModelT], metaclass=abc.ABCMeta):
 
         self._session.add(obj)
 
-        await self._session.commit()
+        await self._commit()
         await self._session.refresh(obj)
 
         return obj
@@ -48,7 +79,7 @@ class RepositoryBase(Generic[ModelT], metaclass=abc.ABCMeta):
         query = update(self._model_cls).values(data.model_dump(exclude_unset=True)).where(spec.execute())
 
         await self._session.execute(query)
-        await self._session.commit()
+        await self._commit()
 
         return (await self._do_get(spec)).scalar_one()
 
@@ -56,12 +87,74 @@ class RepositoryBase(Generic[ModelT], metaclass=abc.ABCMeta):
         query = delete(self._model_cls).where(spec.execute())
 
         await self._session.execute(query)
-        await self._session.commit()
+        await self._commit()
+
+    async def bulk_write(
+            self,
+            to_create: Sequence[pydantic.BaseModel],
+            to_update: Mapping[uuid.UUID, pydantic.BaseModel],
+            to_delete: Collection[uuid.UUID],
+            relation_id: uuid.UUID | None = None
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]], list[uuid.UUID]]:
+        """Creates, updates and deletes the rows of the relation with set-based statements"""
+        table: Table = self._model_cls.__table__  # type: ignore[assignment]
+        relation = {self._relation_key: relation_id} if self._relation_key else {}
+        criteria = [table.c[name] == value for name, value in relation.items()]
+        created: list[dict[str, Any]] = []
+        updated: list[dict[str, Any]] = []
+        deleted: list[uuid.UUID] = []
+
+        if to_create:
+            query = insert(table).returning(*table.c)
+            result = await self._session.execute(query, [{**data.model_dump(), **relation} for data in to_create])
+            created.extend(dict(row) for row in result.mappings())
+
+        for batch in _batches([{'id': row_id, **data.model_dump()} for row_id, data in to_update.items()]):
+            source: Values = values(*(column(name, table.c[name].type) for name in batch[0]), name='source').data(
+                [tuple(row.values()) for row in batch]
+            )
+            update_query: Update = update(table).where(table.c.id == source.c.id, *criteria)
+            update_query = update_query.values({name: source.c[name] for name in batch[0] if name != 'id'})
+            result = await self._session.execute(update_query.returning(*table.c))
+            updated.extend(dict(row) for row in result.mappings())
+
+        for batch in _batches(list(to_delete)):
+            delete_query: Delete = delete(table).where(table.c.id.in_(batch), *criteria)
+            deleted.extend((await self._session.execute(delete_query.returning(table.c.id))).scalars())
+
+        await self._commit()
+
+        return created, updated, deleted
+
+    async def get_content_hashes(self) -> list[dict[str, Any]]:
+        """Returns the ids, parents ids and content hashes of all the rows"""
+        result = await self._session.execute(self._get_content_hashes_query())
+
+        return [dict(row) for row in result.mappings()]
+
+    async def upsert_many(self, rows: Sequence[dict[str, Any]]) -> None:
+        """Inserts the rows or updates the existing ones by id in multi-row statements, without committing"""
+        for batch in _batches(rows):
+            query: Insert = insert(self._model_cls).values(batch)
+            query = query.on_conflict_do_update(
+                index_elements=[self._model_cls.id],
+                set_={name: query.excluded[name] for name in batch[0] if name != 'id'}
+            )
+
+            await self._session.execute(query)
+
+    async def delete_many(self, ids: Collection[uuid.UUID]) -> None:
+        """Deletes the rows by id in set-based statements, without committing"""
+        for batch in _batches(list(ids)):
+            await self._session.execute(delete(self._model_cls).where(self._model_cls.id.in_(batch)))
 
     _model_cls: type[ModelT]
+    _relation_key: str | None = None
 
     async def _do_get(self, spec: SpecificationBase) -> Result:
-        query = self._get_select_query().where(spec.execute())
+        # Reread rows overwrite the ones loaded earlier by the session, e.g. before it wrote them
+        query: Select = self._get_select_query().where(spec.execute())
+        query = query.execution_options(populate_existing=True)
         result = await self._session.execute(query)
 
         return result
@@ -70,9 +163,16 @@ class RepositoryBase(Generic[ModelT], metaclass=abc.ABCMeta):
     def _do_create(self, data: pydantic.BaseModel, relation_id: uuid.UUID | None) -> ModelT:
         pass
 
+    async def _commit(self) -> None:
+        await self._session.commit()
+        await remember_write(self._session)
+
     def _get_select_query(self) -> Select:
         return select(self._model_cls)
 
+    def _get_content_hashes_query(self) -> Select:
+        return select(self._model_cls.id, self._model_cls.content_hash)
+
 
 class MenuRepository(RepositoryBase[Menu]):
     async def get_catalog(self) -> ScalarResult:
@@ -81,6 +181,28 @@ class MenuRepository(RepositoryBase[Menu]):
 
         return result
 
+    async def get_catalog_json(self) -> bytes:
+        """Builds the whole catalog as a JSON document in a single query, without joining rows"""
+        dishes_query: Select = select(
+            _json_agg(
+                _json_object(id=Dish.id, title=Dish.title, description=Dish.description, price=cast(Dish.price, String))
+            )
+        ).where(Dish.submenu_id == Submenu.id)
+        dishes_query = dishes_query.correlate(Submenu)
+        dishes = dishes_query.scalar_subquery()
+        submenus_query: Select = select(
+            _json_agg(
+                _json_object(id=Submenu.id, title=Submenu.title, description=Submenu.description, dishes=dishes)
+            )
+        ).where(Submenu.menu_id == Menu.id)
+        submenus_query = submenus_query.correlate(Menu)
+        submenus = submenus_query.scalar_subquery()
+        menus = _json_agg(_json_object(id=Menu.id, title=Menu.title, description=Menu.description, submenus=submenus))
+        query = select(cast(menus, Text))
+        result = (await self._session.execute(query)).scalar_one()
+
+        return result.encode()
+
     def _do_create(self, data: pydantic.BaseModel, relation_id: uuid.UUID | None) -> Menu:
         menu = self._model_cls(**data.model_dump())
 
@@ -91,6 +213,7 @@ class MenuRepository(RepositoryBase[Menu]):
 
 class SubmenuRepository(RepositoryBase[Submenu]):
     _model_cls = Submenu
+    _relation_key = 'menu_id'
 
     def _do_create(self, data: pydantic.BaseModel, relation_id: uuid.UUID | None) -> Submenu:
         submenu = self._model_cls(**data.model_dump())
@@ -99,9 +222,13 @@ class SubmenuRepository(RepositoryBase[Submenu]):
 
         return submenu
 
+    def _get_content_hashes_query(self) -> Select:
+        return select(self._model_cls.id, self._model_cls.menu_id, self._model_cls.content_hash)
+
 
 class DishesRepository(RepositoryBase[Dish]):
     _model_cls = Dish
+    _relation_key = 'submenu_id'
 
     def _do_create(self, data: pydantic.BaseModel, relation_id: uuid.UUID | None) -> Dish:
         dish = self._model_cls(**data.model_dump())
@@ -112,3 +239,27 @@ class DishesRepository(RepositoryBase[Dish]):
 
     def _get_select_query(self) -> Select:
         return super()._get_select_query().join(Submenu)
+
+    def _get_content_hashes_query(self) -> Select:
+        return select(
+            self._model_cls.id, self._model_cls.submenu_id, Submenu.menu_id, self._model_cls.content_hash
+        ).join(Submenu)
+
+
+def _json_object(**fields: Any) -> ColumnElement:
+    args: list[Any] = []
+
+    for name, value in fields.items():
+        args.extend((literal_column(f"'{name}'"), value))
+
+    return func.json_build_object(*args)
+
+
+def _json_agg(value: ColumnElement) -> ColumnElement:
+    return func.coalesce(func.json_agg(value), literal_column("'[]'::json"))
+
+
+def _batches(items: Sequence[Any]) -> Iterator[Sequence[Any]]:
+    """Splits the items to keep every statement under the bind parameters limit of the driver"""
+    for start in range(0, len(items), SYNC_BATCH_SIZE):
+        yield items[start:start + SYNC_BATCH_SIZE]
@@ -1,13 +1,19 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
 
+from app.cache import COMPRESSORS
 from app.schemas import MenuCatalogSchemaOut
 from app.services.menus import CatalogService
+from app.utils import RawJSONResponse, negotiate_encoding
 
 router = APIRouter(prefix='/catalog', tags=['catalog'])
 
 
 @router.get('', response_model=list[MenuCatalogSchemaOut])
-async def get_catalog(svc: CatalogService = Depends()) -> list[MenuCatalogSchemaOut]:
-    result = await svc.get_catalog()
+async def get_catalog(accept_encoding: str = Header(''), svc: CatalogService = Depends()) -> RawJSONResponse:
+    result, encoding = await svc.get_catalog_encoded(negotiate_encoding(accept_encoding, COMPRESSORS))
+    headers = {'Vary': 'Accept-Encoding'}
 
-    return result
+    if encoding is not None:
+        headers['Content-Encoding'] = encoding
+
+    return RawJSONResponse(result, headers=headers)
@@ -1,12 +1,14 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from starlette import status
 
-from app.dependencies import valid_dish
+from app.config import MAX_PAGE_SIZE, PAGE_SIZE
+from app.dependencies import valid_dish, valid_submenu
 from app.models import Dish
-from app.schemas import DishSchemaIn, DishSchemaOut
+from app.schemas import BulkSchemaIn, BulkSchemaOut, DishSchemaIn, DishSchemaOut
 from app.services.dishes import DishesService
+from app.utils import RawJSONResponse
 
 router = APIRouter(prefix='/menus/{menu_id}/submenus/{submenu_id}/dishes', tags=['dishes'])
 
@@ -15,16 +17,18 @@ router = APIRouter(prefix='/menus/{menu_id}/submenus/{submenu_id}/dishes', tags=
 async def get_list(
         menu_id: UUID,
         submenu_id: UUID,
+        limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after: UUID | None = None,
         dishes_svc: DishesService = Depends()
-) -> list[Dish | DishSchemaOut]:
-    result = await dishes_svc.get_list(menu_id, submenu_id)
+) -> RawJSONResponse:
+    result = await dishes_svc.get_list(menu_id, submenu_id, limit, after)
 
-    return result
+    return RawJSONResponse(result)
 
 
 @router.get('/{dish_id}', response_model=DishSchemaOut)
-async def get(dish: Dish = Depends(valid_dish)) -> Dish:
-    return dish
+async def get(dish: bytes = Depends(valid_dish)) -> RawJSONResponse:
+    return RawJSONResponse(dish)
 
 
 @router.post('', response_model=DishSchemaOut, status_code=status.HTTP_201_CREATED)
@@ -39,6 +43,16 @@ async def create(
     return result
 
 
+@router.post('/bulk', response_model=BulkSchemaOut[DishSchemaOut], dependencies=[Depends(valid_submenu)])
+async def bulk(
+        menu_id: UUID,
+        submenu_id: UUID,
+        bulk_data: BulkSchemaIn[DishSchemaIn],
+        dishes_svc: DishesService = Depends()
+) -> BulkSchemaOut[DishSchemaOut]:
+    return await dishes_svc.bulk(menu_id, submenu_id, bulk_data)
+
+
 @router.patch('/{dish_id}', response_model=DishSchemaOut)
 async def update(
         menu_id: UUID,
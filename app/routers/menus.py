@@ -1,26 +1,32 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from starlette import status
 
+from app.config import MAX_PAGE_SIZE, PAGE_SIZE
 from app.dependencies import valid_menu
 from app.models import Menu
-from app.schemas import MenuSchemaIn, MenuSchemaOut
+from app.schemas import BulkSchemaIn, BulkSchemaOut, MenuSchemaIn, MenuSchemaOut
 from app.services.menus import MenuService
+from app.utils import RawJSONResponse
 
 router = APIRouter(prefix='/menus', tags=['menus'])
 
 
 @router.get('', response_model=list[MenuSchemaOut])
-async def get_list(menu_svc: MenuService = Depends()) -> list[Menu | MenuSchemaOut]:
-    result = await menu_svc.get_list()
+async def get_list(
+        limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after: UUID | None = None,
+        menu_svc: MenuService = Depends()
+) -> RawJSONResponse:
+    result = await menu_svc.get_list(limit, after)
 
-    return result
+    return RawJSONResponse(result)
 
 
 @router.get('/{menu_id}', response_model=MenuSchemaOut)
-async def get(menu: Menu = Depends(valid_menu)) -> Menu:
-    return menu
+async def get(menu: bytes = Depends(valid_menu)) -> RawJSONResponse:
+    return RawJSONResponse(menu)
 
 
 @router.post('', response_model=MenuSchemaOut, status_code=status.HTTP_201_CREATED)
@@ -28,6 +34,14 @@ async def create(menu_data: MenuSchemaIn, menu_svc: MenuService = Depends()) ->
     return await menu_svc.create(menu_data)
 
 
+@router.post('/bulk', response_model=BulkSchemaOut[MenuSchemaOut])
+async def bulk(
+        bulk_data: BulkSchemaIn[MenuSchemaIn],
+        menu_svc: MenuService = Depends()
+) -> BulkSchemaOut[MenuSchemaOut]:
+    return await menu_svc.bulk(bulk_data)
+
+
 @router.patch('/{menu_id}', response_model=MenuSchemaOut)
 async def update(menu_id: UUID, menu_data: MenuSchemaIn, menu_svc: MenuService = Depends()) -> Menu:
     return await menu_svc.update(menu_id, menu_data)
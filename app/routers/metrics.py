@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Response
+
+from app.metrics import render_metrics
+
+router = APIRouter(tags=['metrics'])
+
+
+@router.get('/metrics', include_in_schema=False)
+async def get_metrics() -> Response:
+    content, content_type = render_metrics()
+
+    return Response(content, headers={'Content-Type': content_type})
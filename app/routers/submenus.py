@@ -1,24 +1,31 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from starlette import status
 
-from app.dependencies import valid_submenu
+from app.config import MAX_PAGE_SIZE, PAGE_SIZE
+from app.dependencies import valid_menu, valid_submenu
 from app.models import Submenu
-from app.schemas import SubmenuSchemaIn, SubmenuSchemaOut
+from app.schemas import BulkSchemaIn, BulkSchemaOut, SubmenuSchemaIn, SubmenuSchemaOut
 from app.services.submenus import SubmenuService
+from app.utils import RawJSONResponse
 
 router = APIRouter(prefix='/menus/{menu_id}/submenus', tags=['submenus'])
 
 
 @router.get('', response_model=list[SubmenuSchemaOut])
-async def get_list(menu_id: UUID, submenu_svc: SubmenuService = Depends()) -> list[Submenu | SubmenuSchemaOut]:
-    return await submenu_svc.get_list(menu_id)
+async def get_list(
+        menu_id: UUID,
+        limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after: UUID | None = None,
+        submenu_svc: SubmenuService = Depends()
+) -> RawJSONResponse:
+    return RawJSONResponse(await submenu_svc.get_list(menu_id, limit, after))
 
 
 @router.get('/{submenu_id}', response_model=SubmenuSchemaOut)
-async def get(submenu: Submenu = Depends(valid_submenu)) -> Submenu:
-    return submenu
+async def get(submenu: bytes = Depends(valid_submenu)) -> RawJSONResponse:
+    return RawJSONResponse(submenu)
 
 
 @router.post('', response_model=SubmenuSchemaOut, status_code=status.HTTP_201_CREATED)
@@ -26,6 +33,15 @@ async def create(menu_id: UUID, submenu_data: SubmenuSchemaIn, submenu_svc: Subm
     return await submenu_svc.create(menu_id, submenu_data)
 
 
+@router.post('/bulk', response_model=BulkSchemaOut[SubmenuSchemaOut], dependencies=[Depends(valid_menu)])
+async def bulk(
+        menu_id: UUID,
+        bulk_data: BulkSchemaIn[SubmenuSchemaIn],
+        submenu_svc: SubmenuService = Depends()
+) -> BulkSchemaOut[SubmenuSchemaOut]:
+    return await submenu_svc.bulk(menu_id, bulk_data)
+
+
 @router.patch('/{submenu_id}', response_model=SubmenuSchemaOut)
 async def update(
         menu_id: UUID,
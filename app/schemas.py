@@ -1,8 +1,12 @@
 from decimal import Decimal
+from typing import Generic, TypeVar
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict
 
+InT = TypeVar('InT', bound=BaseModel)
+OutT = TypeVar('OutT', bound=BaseModel)
+
 
 class IdMixin:
     id: UUID
@@ -70,3 +74,15 @@ class MenuCatalogSchemaOut(BaseModel):
     title: str
     description: str
     submenus: list[CatalogSubmenuItemSchema]
+
+
+class BulkSchemaIn(BaseModel, Generic[InT]):
+    create: list[InT] = []
+    update: dict[UUID, InT] = {}
+    delete: list[UUID] = []
+
+
+class BulkSchemaOut(BaseModel, Generic[OutT]):
+    created: list[OutT]
+    updated: list[OutT]
+    deleted: list[UUID]
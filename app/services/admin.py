@@ -1,25 +1,27 @@
+import asyncio
+import contextlib
+import hashlib
+import json
 import os
-from decimal import Decimal
 from typing import Any
 from uuid import UUID
 
-import pandas as pd
-from starlette.background import BackgroundTasks
+from redis.asyncio.lock import Lock
+from redis.exceptions import LockError
 
 from app.cache import RedisCache
-from app.database import get_async_session_cm, get_redis_session_cm
+from app.config import SYNC_LOCK_TTL
+from app.database import get_async_session_cm, get_redis_session_cm, remember_write, track_writes
+from app.metrics import SYNC_PHASE_DURATION, SYNC_ROWS
+from app.models import Dish, Menu, Submenu, content_hash
 from app.repositories import DishesRepository, MenuRepository, SubmenuRepository
-from app.schemas import (
-    CatalogSubmenuItemSchema,
-    DishSchemaOut,
-    DishSchemaXlsx,
-    MenuCatalogSchemaOut,
-    MenuSchemaXlsx,
-    SubmenuSchemaXlsx,
-)
-from app.services.dishes import DishesService
-from app.services.menus import CatalogService, MenuService
-from app.services.submenus import SubmenuService
+from app.schemas import DishSchemaXlsx, MenuSchemaXlsx, SubmenuSchemaXlsx
+from app.services.warmup import warm_up_cache
+from app.sheets import read_catalog
+
+CHECKPOINT_KEY = 'sync:checkpoint:{0}'
+LOCK_KEY = 'lock:sync:{0}'
+HASH_CHUNK_SIZE = 1024 * 1024
 
 
 class AdminService:
@@ -27,10 +29,6 @@ class AdminService:
         self.filename = filename
         self.db_session = get_async_session_cm
         self.redis_session = get_redis_session_cm
-        self.catalog_svc_cls = CatalogService
-        self.menu_svc_cls = MenuService
-        self.submenu_svc_cls = SubmenuService
-        self.dish_svc_cls = DishesService
         self.menu_repo = MenuRepository
         self.submenu_repo = SubmenuRepository
         self.dish_repo = DishesRepository
@@ -38,165 +36,221 @@ class AdminService:
         self.submenus_to_insert: dict[UUID, Any] = {}
         self.dishes_to_insert: dict[UUID, Any] = {}
         self.menus_to_update: dict[UUID, Any] = {}
-        self.menus_to_delete: list[UUID] = []
+        self.menus_to_delete: list[dict[str, UUID]] = []
         self.submenus_to_update: dict[UUID, Any] = {}
         self.submenus_to_delete: list[dict[str, UUID]] = []
         self.dishes_to_update: dict[UUID, Any] = {}
         self.dishes_to_delete: list[dict[str, UUID]] = []
 
-    async def execute(self) -> None:
+    async def execute(self, force: bool = False) -> bool:
+        """Syncs the database with the file, unless the file is unchanged or already syncing"""
         if not os.path.exists(self.filename):
-            return
-
-        self.__process_excel()
-        await self.__process_menu_catalog()
-        await self.__sync_db()
-
-    def __process_excel(self) -> None:
-        catalog_df = pd.read_excel(self.filename, header=None)
-        menu_slice = slice(0, 3)
-        submenu_slice = slice(1, 4)
-        dish_slice = slice(2, 5)
-        menu_id, submenu_id = None, None
-
-        for i, row in catalog_df.iterrows():
-            if row.iloc[menu_slice].notna().all():
-                menu_item = self.__process_menu_row(row)
-                menu_id = menu_item['id']
-            elif menu_id is not None and row.iloc[submenu_slice].notna().all():
-                submenu_item = self.__process_submenu_row(row, menu_id)
-                submenu_id = submenu_item['id']
-            elif menu_id is not None and row.iloc[dish_slice].notna().all():
-                self.__process_dish_row(row, submenu_id, menu_id)
-
-    async def __process_menu_catalog(self) -> None:
-        async with self.db_session() as db:
-            async with self.redis_session() as redis:
-                catalog = await self.catalog_svc_cls(self.menu_repo(db), RedisCache(redis)).get_catalog()
+            return True
 
-        for menu in catalog:
-            self.__process_menu_item(menu)
+        async with self.redis_session() as redis:
+            lock = redis.lock(LOCK_KEY.format(os.path.abspath(self.filename)), timeout=SYNC_LOCK_TTL)
 
-    async def __sync_db(self) -> None:
-        async with self.db_session() as db:
-            async with self.redis_session() as redis:
-                background_tasks = BackgroundTasks()
-                menu_service = self.menu_svc_cls(background_tasks, self.menu_repo(db), RedisCache(redis))
-                submenu_service = self.submenu_svc_cls(background_tasks, self.submenu_repo(db), RedisCache(redis))
-                dish_service = self.dish_svc_cls(background_tasks, self.dish_repo(db), RedisCache(redis))
+            if not await lock.acquire(blocking=False):
+                return False
 
-                for menu in self.menus_to_insert.values():
-                    await menu_service.create(MenuSchemaXlsx(**menu))
+            keeper = asyncio.create_task(self.__keep_lock(lock))
 
-                for submenu in self.submenus_to_insert.values():
-                    await submenu_service.create(submenu['menu_id'], SubmenuSchemaXlsx(**submenu))
+            try:
+                await self.__execute(force)
+            finally:
+                keeper.cancel()
 
-                for dish in self.dishes_to_insert.values():
-                    await dish_service.create(dish['menu_id'], dish['submenu_id'], DishSchemaXlsx(**dish))
+                with contextlib.suppress(asyncio.CancelledError, LockError):
+                    await keeper
 
-                for menu in self.menus_to_update.values():
-                    await menu_service.update(menu['id'], MenuSchemaXlsx(**menu))
+                with contextlib.suppress(LockError):
+                    await lock.release()
 
-                for submenu in self.submenus_to_update.values():
-                    await submenu_service.update(submenu['menu_id'], submenu['id'], SubmenuSchemaXlsx(**submenu))
+        return True
 
-                for dish in self.dishes_to_update.values():
-                    await dish_service.update(dish['menu_id'], dish['submenu_id'], dish['id'], DishSchemaXlsx(**dish))
+    @staticmethod
+    async def __keep_lock(lock: Lock) -> None:
+        while True:
+            await asyncio.sleep(SYNC_LOCK_TTL / 3)
+            await lock.reacquire()
 
-                for dish in self.dishes_to_delete:
-                    await dish_service.delete(dish['menu_id'], dish['submenu_id'], dish['id'])
+    async def __execute(self, force: bool) -> None:
+        stat = os.stat(self.filename)
+        checkpoint: dict[str, int | str] = {'mtime': stat.st_mtime_ns, 'size': stat.st_size}
 
-                for submenu in self.submenus_to_delete:
-                    await submenu_service.delete(submenu['menu_id'], submenu['id'])
+        async with self.redis_session() as redis:
+            stored = json.loads(await redis.get(self.__checkpoint_key) or '{}')
 
-                for menu_id in self.menus_to_delete:
-                    await menu_service.delete(menu_id)
+            if not force and stored.get('mtime') == checkpoint['mtime'] and stored.get('size') == checkpoint['size']:
+                return
 
-    def __process_menu_row(self, row: pd.Series) -> dict[str, Any]:
-        menu_id = UUID(row.iloc[0])
-        menu_item = {
-            'id': menu_id,
-            'title': row.iloc[1],
-            'description': row.iloc[2]
-        }
+            with SYNC_PHASE_DURATION.labels('hash').time():
+                checkpoint['hash'] = self.__get_file_hash()
+
+            if not force and stored.get('hash') == checkpoint['hash']:
+                await redis.set(self.__checkpoint_key, json.dumps(checkpoint))
+
+                return
+
+        with SYNC_PHASE_DURATION.labels('parse').time():
+            self.__process_sheet()
+
+        with SYNC_PHASE_DURATION.labels('diff').time():
+            await self.__process_db_rows()
+
+        with SYNC_PHASE_DURATION.labels('write').time(), track_writes():
+            synced = await self.__sync_db()
 
-        self.menus_to_insert[menu_id] = menu_item
+        async with self.redis_session() as redis:
+            await redis.set(self.__checkpoint_key, json.dumps(checkpoint))
 
-        return menu_item
+        if synced:
+            with SYNC_PHASE_DURATION.labels('warmup').time():
+                await warm_up_cache()
 
-    def __process_submenu_row(self, row: pd.Series, menu_id: UUID) -> dict[str, Any]:
-        submenu_id = UUID(row.iloc[1])
-        submenu_item = {
-            'id': submenu_id,
-            'menu_id': menu_id,
-            'title': row.iloc[2],
-            'description': row.iloc[3]
+    @property
+    def __checkpoint_key(self) -> str:
+        return CHECKPOINT_KEY.format(os.path.abspath(self.filename))
+
+    def __get_file_hash(self) -> str:
+        file_hash = hashlib.sha256()
+
+        with open(self.filename, 'rb') as file:
+            while chunk := file.read(HASH_CHUNK_SIZE):
+                file_hash.update(chunk)
+
+        return file_hash.hexdigest()
+
+    def __process_sheet(self) -> None:
+        items_to_insert = {
+            'menu': (self.menus_to_insert, Menu.content_fields),
+            'submenu': (self.submenus_to_insert, Submenu.content_fields),
+            'dish': (self.dishes_to_insert, Dish.content_fields),
         }
 
-        self.submenus_to_insert[submenu_id] = submenu_item
+        for item_type, item in read_catalog(self.filename):
+            items, content_fields = items_to_insert[item_type]
+            item['content_hash'] = content_hash(*(item[name] for name in content_fields))
+            items[item['id']] = item
 
-        return submenu_item
+    async def __process_db_rows(self) -> None:
+        async with self.db_session() as db:
+            menus = await self.menu_repo(db).get_content_hashes()
+            submenus = await self.submenu_repo(db).get_content_hashes()
+            dishes = await self.dish_repo(db).get_content_hashes()
 
-    def __process_dish_row(self, row: pd.Series, submenu_id: Any, menu_id: Any) -> None:
-        dish_id = UUID(row.iloc[2])
-        dish_item = {
-            'id': dish_id,
-            'submenu_id': submenu_id,
-            'menu_id': menu_id,
-            'title': row.iloc[3],
-            'description': row.iloc[4],
-            'price': Decimal(row.iloc[5]),
+        self.__diff(menus, self.menus_to_insert, self.menus_to_update, self.menus_to_delete)
+        self.__diff(submenus, self.submenus_to_insert, self.submenus_to_update, self.submenus_to_delete)
+        self.__diff(dishes, self.dishes_to_insert, self.dishes_to_update, self.dishes_to_delete)
+
+    async def __sync_db(self) -> bool:
+        """Applies all the changes in a single transaction, returns whether there were any"""
+        menus = [*self.menus_to_insert.values(), *self.menus_to_update.values()]
+        submenus = [*self.submenus_to_insert.values(), *self.submenus_to_update.values()]
+        dishes = [*self.dishes_to_insert.values(), *self.dishes_to_update.values()]
+        to_delete = self.menus_to_delete, self.submenus_to_delete, self.dishes_to_delete
+
+        if not any((menus, submenus, dishes, *to_delete)):
+            return False
+
+        async with self.db_session() as db:
+            await self.menu_repo(db).upsert_many([MenuSchemaXlsx(**menu).model_dump() for menu in menus])
+            await self.submenu_repo(db).upsert_many([
+                {**SubmenuSchemaXlsx(**submenu).model_dump(), 'menu_id': submenu['menu_id']} for submenu in submenus
+            ])
+            await self.dish_repo(db).upsert_many([
+                {**DishSchemaXlsx(**dish).model_dump(), 'submenu_id': dish['submenu_id']} for dish in dishes
+            ])
+            await self.dish_repo(db).delete_many([dish['id'] for dish in self.dishes_to_delete])
+            await self.submenu_repo(db).delete_many([submenu['id'] for submenu in self.submenus_to_delete])
+            await self.menu_repo(db).delete_many([menu['id'] for menu in self.menus_to_delete])
+            await db.commit()
+            await remember_write(db)
+
+        self.__count_rows()
+
+        cache_keys, cache_scopes = self.__get_cache_changes()
+
+        async with self.redis_session() as redis:
+            cache = RedisCache(redis)
+
+            await cache.delete(*cache_keys)
+            await cache.invalidate(*cache_scopes)
+
+        return True
+
+    def __count_rows(self) -> None:
+        changes = {
+            'menu': (self.menus_to_insert, self.menus_to_update, self.menus_to_delete),
+            'submenu': (self.submenus_to_insert, self.submenus_to_update, self.submenus_to_delete),
+            'dish': (self.dishes_to_insert, self.dishes_to_update, self.dishes_to_delete),
         }
 
-        self.dishes_to_insert[dish_id] = dish_item
-
-    def __process_menu_item(self, item: MenuCatalogSchemaOut) -> None:
-        item_id = item.id
-        excel_item = self.menus_to_insert.get(item_id)
-
-        if excel_item is None:
-            self.menus_to_delete.append(item_id)
-            self.menus_to_insert.pop(item_id)
-        elif item.title != excel_item['title'] or item.description != excel_item['description']:
-            self.menus_to_update[item_id] = self.menus_to_insert.pop(item_id)
-        elif item.title == excel_item['title'] and item.description == excel_item['description']:
-            self.menus_to_insert.pop(item_id)
-
-        for submenu_item in item.submenus:
-            self.__process_submenu_item(submenu_item, item.id)
-
-    def __process_submenu_item(self, item: CatalogSubmenuItemSchema, menu_id: UUID) -> None:
-        item_id = item.id
-        excel_item = self.submenus_to_insert.get(item_id)
-
-        if excel_item is None:
-            self.submenus_to_delete.append({'id': item_id, 'menu_id': menu_id})
-            self.submenus_to_insert.pop(item_id)
-        elif item.title != excel_item['title'] or \
-                item.description != excel_item['description'] or \
-                menu_id != excel_item['menu_id']:
-            self.submenus_to_update[item_id] = self.submenus_to_insert.pop(item_id)
-        elif item.title == excel_item['title'] and \
-                item.description == excel_item['description'] and \
-                menu_id == excel_item['menu_id']:
-            self.submenus_to_insert.pop(item_id)
-
-        for dish_item in item.dishes:
-            self.__process_dish_item(dish_item, item_id, menu_id)
-
-    def __process_dish_item(self, item: DishSchemaOut, submenu_id: UUID, menu_id: UUID) -> None:
-        item_id = item.id
-        excel_item = self.dishes_to_insert.get(item_id)
-
-        if excel_item is None:
-            self.dishes_to_delete.append({'id': item_id, 'submenu_id': submenu_id, 'menu_id': menu_id})
-        elif item.title != excel_item['title'] or \
-                item.description != excel_item['description'] or \
-                item.price != excel_item['price'] or \
-                submenu_id != excel_item['submenu_id']:
-            self.dishes_to_update[item_id] = self.dishes_to_insert.pop(item_id)
-        elif item.title == excel_item['title'] and \
-                item.description == excel_item['description'] and \
-                item.price == excel_item['price'] and \
-                submenu_id == excel_item['submenu_id']:
-            self.dishes_to_insert.pop(item_id)
+        for entity, (inserted, updated, deleted) in changes.items():
+            SYNC_ROWS.labels(entity, 'insert').inc(len(inserted))
+            SYNC_ROWS.labels(entity, 'update').inc(len(updated))
+            SYNC_ROWS.labels(entity, 'delete').inc(len(deleted))
+
+    def __get_cache_changes(self) -> tuple[set[str], set[str]]:
+        """Returns the cache keys to delete and the scopes to invalidate after the sync"""
+        cache_keys, cache_scopes = {'catalog'}, {'menus-list'}
+
+        def touch_menu(menu_id: UUID) -> None:
+            cache_keys.add(f'menus:{menu_id}')
+
+        def touch_submenu(menu_id: UUID, submenu_id: UUID) -> None:
+            touch_menu(menu_id)
+            cache_keys.add(f'submenus:{menu_id}:{submenu_id}')
+            cache_scopes.add(f'submenus-list:{menu_id}')
+
+        def touch_dish(menu_id: UUID, submenu_id: UUID, dish_id: UUID) -> None:
+            touch_submenu(menu_id, submenu_id)
+            cache_keys.add(f'dishes:{menu_id}:{submenu_id}:{dish_id}')
+            cache_scopes.add(f'dishes-list:{submenu_id}')
+
+        for menu in [*self.menus_to_insert.values(), *self.menus_to_update.values()]:
+            touch_menu(menu['id'])
+
+        for menu in self.menus_to_delete:
+            touch_menu(menu['id'])
+            cache_scopes.add(f'menu:{menu["id"]}')
+
+        for submenu in [*self.submenus_to_insert.values(), *self.submenus_to_update.values()]:
+            touch_submenu(submenu['menu_id'], submenu['id'])
+
+            if submenu.get('old_menu_id', submenu['menu_id']) != submenu['menu_id']:
+                touch_submenu(submenu['old_menu_id'], submenu['id'])
+                cache_scopes.add(f'submenu:{submenu["id"]}')
+
+        for submenu in self.submenus_to_delete:
+            touch_submenu(submenu['menu_id'], submenu['id'])
+            cache_scopes.add(f'submenu:{submenu["id"]}')
+
+        for dish in [*self.dishes_to_insert.values(), *self.dishes_to_update.values()]:
+            touch_dish(dish['menu_id'], dish['submenu_id'], dish['id'])
+
+            if dish.get('old_submenu_id', dish['submenu_id']) != dish['submenu_id']:
+                touch_dish(dish['old_menu_id'], dish['old_submenu_id'], dish['id'])
+
+        for dish in self.dishes_to_delete:
+            touch_dish(dish['menu_id'], dish['submenu_id'], dish['id'])
+
+        return cache_keys, cache_scopes
+
+    @staticmethod
+    def __diff(
+            rows: list[dict[str, Any]],
+            items_to_insert: dict[UUID, Any],
+            items_to_update: dict[UUID, Any],
+            items_to_delete: list[dict[str, UUID]]
+    ) -> None:
+        """Splits the sheet items into inserted, updated and unchanged ones by content hash"""
+        for row in rows:
+            item = items_to_insert.pop(row['id'], None)
+
+            if item is None:
+                items_to_delete.append(row)
+            elif item['content_hash'] != row['content_hash']:
+                items_to_update[row['id']] = {
+                    **item, **{f'old_{name}': value for name, value in row.items() if name.endswith('_id')}
+                }
@@ -1,79 +1,113 @@
 from uuid import UUID
 
 from fastapi import Depends
+from pydantic import TypeAdapter
 from starlette.background import BackgroundTasks
 
-from app.cache import RedisCache
+from app.cache import RedisCache, get_cache
+from app.config import CACHE_WRITE_THROUGH
 from app.models import Dish
 from app.repositories import DishesRepository
-from app.schemas import DishSchemaIn, DishSchemaOut
+from app.schemas import BulkSchemaIn, BulkSchemaOut, DishSchemaIn, DishSchemaOut
 from app.specifications import (
     DishDeleteUpdateSpecification,
     DishListSpecification,
     DishSpecification,
 )
 
+dish_adapter = TypeAdapter(DishSchemaOut)
+dishes_adapter = TypeAdapter(list[DishSchemaOut])
+
 
 class DishesService:
     def __init__(
             self,
             background_tasks: BackgroundTasks,
             repo: DishesRepository = Depends(),
-            cache: RedisCache = Depends()
+            cache: RedisCache = Depends(get_cache)
     ):
         self.__bg_tasks = background_tasks
         self.__repo = repo
         self.__cache = cache
 
-    async def get_by_id(self, menu_id: UUID, submenu_id: UUID, dish_id: UUID) -> Dish | DishSchemaOut | None:
+    async def get_by_id(self, menu_id: UUID, submenu_id: UUID, dish_id: UUID) -> bytes | None:
         cache_key = f'dishes:{menu_id}:{submenu_id}:{dish_id}'
-        cached = await self.__cache.get(cache_key)
-
-        if not cached:
-            result = await self.__repo.get(DishSpecification(menu_id, submenu_id, dish_id))
 
-            await self.__cache.set(cache_key, result)
-        else:
-            result = DishSchemaOut.model_validate(cached)
+        return await self.__cache.get_or_load(cache_key, lambda: self.__load(menu_id, submenu_id, dish_id))
 
-        return result
+    async def get_list(self, menu_id: UUID, submenu_id: UUID, limit: int, after: UUID | None = None) -> bytes | None:
+        cache_key = f'dishes-page:{menu_id}:{submenu_id}:{after or ""}:{limit}'
 
-    async def get_list(self, menu_id: UUID, submenu_id: UUID) -> list[Dish | DishSchemaOut]:
-        cache_key = f'dishes:{menu_id}:{submenu_id}'
-        cached = await self.__cache.get(cache_key)
-
-        if not cached:
-            result = await self.__repo.get_list(DishListSpecification(menu_id, submenu_id))
-
-            await self.__cache.set(cache_key, result)
-        else:
-            result = list(map(DishSchemaOut.model_validate, cached))
-
-        return result
+        return await self.__cache.get_or_load(cache_key, lambda: self.__load_list(menu_id, submenu_id, limit, after))
 
     async def create(self, menu_id: UUID, submenu_id: UUID, dish_data: DishSchemaIn) -> Dish:
-        cache_key = 'menus', f'menus:{menu_id}', f'submenus:{menu_id}', f'submenus:{menu_id}:{submenu_id}', 'catalog'
         dish = await self.__repo.create(dish_data, submenu_id)
+        cache_keys = (
+            f'menus:{menu_id}', f'submenus:{menu_id}:{submenu_id}', f'dishes:{menu_id}:{submenu_id}:{dish.id}',
+            'catalog'
+        )
+        cache_scopes = 'menus-list', f'submenus-list:{menu_id}', f'dishes-list:{submenu_id}'
 
-        self.__bg_tasks.add_task(self.__cache.delete, *cache_key)
+        self.__bg_tasks.add_task(self.__cache.delete, *cache_keys)
+        self.__bg_tasks.add_task(self.__cache.invalidate, *cache_scopes)
 
         return dish
 
     async def update(self, menu_id: UUID, submenu_id: UUID, dish_id: UUID, update_data: DishSchemaIn) -> Dish:
-        cache_keys = f'dishes:{menu_id}:{submenu_id}', f'dishes:{menu_id}:{submenu_id}:{dish_id}', 'catalog'
+        cache_keys = f'dishes:{menu_id}:{submenu_id}:{dish_id}', 'catalog'
         result = await self.__repo.update(DishDeleteUpdateSpecification(menu_id, submenu_id, dish_id), update_data)
 
-        self.__bg_tasks.add_task(self.__cache.delete, *cache_keys)
+        if CACHE_WRITE_THROUGH:
+            self.__bg_tasks.add_task(
+                self.__cache.write_through,
+                f'dishes:{menu_id}:{submenu_id}:{dish_id}',
+                lambda: self.__load(menu_id, submenu_id, dish_id),
+            )
+        else:
+            self.__bg_tasks.add_task(self.__cache.delete, *cache_keys)
+            self.__bg_tasks.add_task(self.__cache.invalidate, f'dishes-list:{submenu_id}')
 
         return result
 
     async def delete(self, menu_id: UUID, submenu_id: UUID, dish_id: UUID) -> None:
         cache_keys = (
-            'menus', f'menus:{menu_id}',
-            f'submenus:{menu_id}', f'submenus:{menu_id}:{submenu_id}',
-            f'dishes:{menu_id}:{submenu_id}', f'dishes:{menu_id}:{submenu_id}:{dish_id}',
+            f'menus:{menu_id}', f'submenus:{menu_id}:{submenu_id}', f'dishes:{menu_id}:{submenu_id}:{dish_id}',
             'catalog'
         )
+        cache_scopes = 'menus-list', f'submenus-list:{menu_id}', f'dishes-list:{submenu_id}'
 
         await self.__repo.delete(DishDeleteUpdateSpecification(menu_id, submenu_id, dish_id))
         self.__bg_tasks.add_task(self.__cache.delete, *cache_keys)
+        self.__bg_tasks.add_task(self.__cache.invalidate, *cache_scopes)
+
+    async def bulk(
+            self,
+            menu_id: UUID,
+            submenu_id: UUID,
+            bulk_data: BulkSchemaIn[DishSchemaIn]
+    ) -> BulkSchemaOut[DishSchemaOut]:
+        created, updated, deleted = await self.__repo.bulk_write(
+            bulk_data.create, bulk_data.update, bulk_data.delete, submenu_id
+        )
+        dish_ids = [row['id'] for row in created + updated] + deleted
+        cache_keys = ['catalog', *(f'dishes:{menu_id}:{submenu_id}:{dish_id}' for dish_id in dish_ids)]
+        cache_scopes = [f'dishes-list:{submenu_id}']
+
+        if created or deleted:
+            cache_keys += f'menus:{menu_id}', f'submenus:{menu_id}:{submenu_id}'
+            cache_scopes += 'menus-list', f'submenus-list:{menu_id}'
+
+        self.__bg_tasks.add_task(self.__cache.delete, *cache_keys)
+        self.__bg_tasks.add_task(self.__cache.invalidate, *cache_scopes)
+
+        return BulkSchemaOut[DishSchemaOut](created=created, updated=updated, deleted=deleted)
+
+    async def __load(self, menu_id: UUID, submenu_id: UUID, dish_id: UUID) -> bytes | None:
+        dish = await self.__repo.get(DishSpecification(menu_id, submenu_id, dish_id))
+
+        return None if dish is None else dish_adapter.dump_json(dish_adapter.validate_python(dish))
+
+    async def __load_list(self, menu_id: UUID, submenu_id: UUID, limit: int, after: UUID | None) -> bytes:
+        dishes = await self.__repo.get_list(DishListSpecification(menu_id, submenu_id), limit, after)
+
+        return dishes_adapter.dump_json(dishes_adapter.validate_python(dishes))
@@ -4,89 +4,108 @@ from fastapi import Depends
 from pydantic import TypeAdapter
 from starlette.background import BackgroundTasks
 
-from app.cache import RedisCache
+from app.cache import RedisCache, get_cache
+from app.config import CACHE_WRITE_THROUGH, CATALOG_ENGINE
 from app.models import Menu
 from app.repositories import MenuRepository
-from app.schemas import MenuCatalogSchemaOut, MenuSchemaIn, MenuSchemaOut
+from app.schemas import (
+    BulkSchemaIn,
+    BulkSchemaOut,
+    MenuCatalogSchemaOut,
+    MenuSchemaIn,
+    MenuSchemaOut,
+)
 from app.specifications import MenuSpecification
 
+menu_adapter = TypeAdapter(MenuSchemaOut)
+menus_adapter = TypeAdapter(list[MenuSchemaOut])
+catalog_adapter = TypeAdapter(list[MenuCatalogSchemaOut])
+
 
 class MenuService:
     def __init__(
             self,
             background_tasks: BackgroundTasks,
             repo: MenuRepository = Depends(),
-            cache: RedisCache = Depends()
+            cache: RedisCache = Depends(get_cache)
     ):
         self.__bg_tasks = background_tasks
         self.__repo = repo
         self.__cache = cache
 
-    async def get_by_id(self, menu_id: UUID) -> Menu | MenuSchemaOut | None:
-        cache_key = f'menus:{menu_id}'
-        cached = await self.__cache.get(cache_key)
-
-        if not cached:
-            result = await self.__repo.get(MenuSpecification(menu_id))
-
-            await self.__cache.set(cache_key, result)
-        else:
-            result = MenuSchemaOut.model_validate(cached)
-
-        return result
-
-    async def get_list(self) -> list[Menu | MenuSchemaOut]:
-        cache_key = 'menus'
-        cached = await self.__cache.get(cache_key)
-
-        if not cached:
-            result = await self.__repo.get_list()
+    async def get_by_id(self, menu_id: UUID) -> bytes | None:
+        return await self.__cache.get_or_load(f'menus:{menu_id}', lambda: self.__load(menu_id))
 
-            await self.__cache.set(cache_key, result)
-        else:
-            result = list(map(MenuSchemaOut.model_validate, cached))
+    async def get_list(self, limit: int, after: UUID | None = None) -> bytes | None:
+        cache_key = f'menus-page:{after or ""}:{limit}'
 
-        return result
+        return await self.__cache.get_or_load(cache_key, lambda: self.__load_list(limit, after))
 
     async def create(self, menu_data: MenuSchemaIn) -> Menu:
-        cache_key = 'menus', 'catalog'
         menu = await self.__repo.create(menu_data)
+        cache_keys = f'menus:{menu.id}', 'catalog'
 
-        self.__bg_tasks.add_task(self.__cache.delete, *cache_key)
+        self.__bg_tasks.add_task(self.__cache.delete, *cache_keys)
+        self.__bg_tasks.add_task(self.__cache.invalidate, 'menus-list')
 
         return menu
 
     async def update(self, menu_id: UUID, update_data: MenuSchemaIn) -> Menu:
-        cache_keys = 'menus', f'menus:{menu_id}', 'catalog'
+        cache_keys = f'menus:{menu_id}', 'catalog'
         result = await self.__repo.update(MenuSpecification(menu_id), update_data)
 
-        self.__bg_tasks.add_task(self.__cache.delete, *cache_keys)
+        if CACHE_WRITE_THROUGH:
+            self.__bg_tasks.add_task(self.__cache.write_through, f'menus:{menu_id}', lambda: self.__load(menu_id))
+        else:
+            self.__bg_tasks.add_task(self.__cache.delete, *cache_keys)
+            self.__bg_tasks.add_task(self.__cache.invalidate, 'menus-list')
 
         return result
 
     async def delete(self, menu_id: UUID) -> None:
-        cache_keys = 'menus', f'menus:{menu_id}', f'submenus:{menu_id}*', f'dishes:{menu_id}*', 'catalog'
+        cache_keys = f'menus:{menu_id}', 'catalog'
 
         await self.__repo.delete(MenuSpecification(menu_id))
         self.__bg_tasks.add_task(self.__cache.delete, *cache_keys)
+        self.__bg_tasks.add_task(self.__cache.invalidate, 'menus-list', f'menu:{menu_id}')
+
+    async def bulk(self, bulk_data: BulkSchemaIn[MenuSchemaIn]) -> BulkSchemaOut[MenuSchemaOut]:
+        created, updated, deleted = await self.__repo.bulk_write(bulk_data.create, bulk_data.update, bulk_data.delete)
+        menu_ids = [row['id'] for row in created + updated] + deleted
+        cache_keys = ['catalog', *(f'menus:{menu_id}' for menu_id in menu_ids)]
+        cache_scopes = ['menus-list', *(f'menu:{menu_id}' for menu_id in deleted)]
+
+        self.__bg_tasks.add_task(self.__cache.delete, *cache_keys)
+        self.__bg_tasks.add_task(self.__cache.invalidate, *cache_scopes)
+
+        return BulkSchemaOut[MenuSchemaOut](created=created, updated=updated, deleted=deleted)
+
+    async def __load(self, menu_id: UUID) -> bytes | None:
+        menu = await self.__repo.get(MenuSpecification(menu_id))
+
+        return None if menu is None else menu_adapter.dump_json(menu_adapter.validate_python(menu))
+
+    async def __load_list(self, limit: int, after: UUID | None) -> bytes:
+        menus = await self.__repo.get_list(limit=limit, after=after)
+
+        return menus_adapter.dump_json(menus_adapter.validate_python(menus))
 
 
 class CatalogService:
-    def __init__(self, repo: MenuRepository = Depends(), cache: RedisCache = Depends()):
+    def __init__(self, repo: MenuRepository = Depends(), cache: RedisCache = Depends(get_cache)):
         self.__repo = repo
         self.__cache = cache
 
-    async def get_catalog(self) -> list[MenuCatalogSchemaOut]:
-        cache_key = 'catalog'
-        cached = await self.__cache.get(cache_key)
+    async def get_catalog_json(self) -> bytes | None:
+        """Returns the catalog as a ready-to-send JSON document"""
+        return await self.__cache.get_or_load('catalog', self.__load)
 
-        if not cached:
-            result = await self.__repo.get_catalog()
-            adapter = TypeAdapter(list[MenuCatalogSchemaOut])
-            result = adapter.validate_python(result)
+    async def get_catalog_encoded(self, encoding: str | None) -> tuple[bytes | None, str | None]:
+        """Returns the catalog JSON document precompressed with the encoding, unless it is too small to be"""
+        return await self.__cache.get_or_load_encoded('catalog', self.__load, encoding)
 
-            await self.__cache.set(cache_key, result)
-        else:
-            result = list(map(MenuCatalogSchemaOut.model_validate, cached))
+    async def __load(self) -> bytes:
+        if CATALOG_ENGINE == 'sql':
+            return await self.__repo.get_catalog_json()
 
-        return result
+        return catalog_adapter.dump_json(catalog_adapter.validate_python(await self.__repo.get_catalog()))
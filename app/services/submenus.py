@@ -1,75 +1,99 @@
 from uuid import UUID
 
 from fastapi import Depends
+from pydantic import TypeAdapter
 from starlette.background import BackgroundTasks
 
-from app.cache import RedisCache
+from app.cache import RedisCache, get_cache
+from app.config import CACHE_WRITE_THROUGH
 from app.models import Submenu
 from app.repositories import SubmenuRepository
-from app.schemas import SubmenuSchemaIn, SubmenuSchemaOut
+from app.schemas import BulkSchemaIn, BulkSchemaOut, SubmenuSchemaIn, SubmenuSchemaOut
 from app.specifications import SubmenuListSpecification, SubmenuSpecification
 
+submenu_adapter = TypeAdapter(SubmenuSchemaOut)
+submenus_adapter = TypeAdapter(list[SubmenuSchemaOut])
+
 
 class SubmenuService:
     def __init__(
             self,
             background_tasks: BackgroundTasks,
             repo: SubmenuRepository = Depends(),
-            cache: RedisCache = Depends()
+            cache: RedisCache = Depends(get_cache)
     ):
         self.__bg_tasks = background_tasks
         self.__repo = repo
         self.__cache = cache
 
-    async def get_by_id(self, menu_id: UUID, submenu_id: UUID) -> Submenu | SubmenuSchemaOut | None:
+    async def get_by_id(self, menu_id: UUID, submenu_id: UUID) -> bytes | None:
         cache_key = f'submenus:{menu_id}:{submenu_id}'
-        cached = await self.__cache.get(cache_key)
-
-        if not cached:
-            result = await self.__repo.get(SubmenuSpecification(menu_id, submenu_id))
-
-            await self.__cache.set(cache_key, result)
-        else:
-            result = SubmenuSchemaOut.model_validate(cached)
 
-        return result
+        return await self.__cache.get_or_load(cache_key, lambda: self.__load(menu_id, submenu_id))
 
-    async def get_list(self, menu_id: UUID) -> list[Submenu | SubmenuSchemaOut]:
-        cache_key = f'submenus:{menu_id}'
-        cached = await self.__cache.get(cache_key)
+    async def get_list(self, menu_id: UUID, limit: int, after: UUID | None = None) -> bytes | None:
+        cache_key = f'submenus-page:{menu_id}:{after or ""}:{limit}'
 
-        if not cached:
-            result = await self.__repo.get_list(SubmenuListSpecification(menu_id))
-
-            await self.__cache.set(cache_key, result)
-        else:
-            result = list(map(SubmenuSchemaOut.model_validate, cached))
-
-        return result
+        return await self.__cache.get_or_load(cache_key, lambda: self.__load_list(menu_id, limit, after))
 
     async def create(self, menu_id: UUID, submenu_data: SubmenuSchemaIn) -> Submenu:
-        cache_keys = 'menus', f'menus:{menu_id}', f'submenus:{menu_id}', 'catalog'
         submenu = await self.__repo.create(submenu_data, menu_id)
+        cache_keys = f'menus:{menu_id}', f'submenus:{menu_id}:{submenu.id}', 'catalog'
 
         self.__bg_tasks.add_task(self.__cache.delete, *cache_keys)
+        self.__bg_tasks.add_task(self.__cache.invalidate, 'menus-list', f'submenus-list:{menu_id}')
 
         return submenu
 
     async def update(self, menu_id: UUID, submenu_id: UUID, update_data: SubmenuSchemaIn) -> Submenu:
-        cache_key = f'submenus:{menu_id}:{submenu_id}', f'submenus:{menu_id}', 'catalog'
+        cache_keys = f'submenus:{menu_id}:{submenu_id}', 'catalog'
         result = await self.__repo.update(SubmenuSpecification(menu_id, submenu_id), update_data)
 
-        self.__bg_tasks.add_task(self.__cache.delete, *cache_key)
+        if CACHE_WRITE_THROUGH:
+            self.__bg_tasks.add_task(
+                self.__cache.write_through, f'submenus:{menu_id}:{submenu_id}', lambda: self.__load(menu_id, submenu_id)
+            )
+        else:
+            self.__bg_tasks.add_task(self.__cache.delete, *cache_keys)
+            self.__bg_tasks.add_task(self.__cache.invalidate, f'submenus-list:{menu_id}')
 
         return result
 
     async def delete(self, menu_id: UUID, submenu_id: UUID) -> None:
-        cache_keys = (
-            'menus', f'menus:{menu_id}',
-            f'submenus:{menu_id}', f'submenus:{menu_id}:{submenu_id}',
-            f'dishes:{menu_id}:{submenu_id}*',
-            'catalog'
-        )
+        cache_keys = f'menus:{menu_id}', f'submenus:{menu_id}:{submenu_id}', 'catalog'
+        cache_scopes = 'menus-list', f'submenus-list:{menu_id}', f'submenu:{submenu_id}'
 
         await self.__repo.delete(SubmenuSpecification(menu_id, submenu_id))
         self.__bg_tasks.add_task(self.__cache.delete, *cache_keys)
+        self.__bg_tasks.add_task(self.__cache.invalidate, *cache_scopes)
+
+    async def bulk(
+            self,
+            menu_id: UUID,
+            bulk_data: BulkSchemaIn[SubmenuSchemaIn]
+    ) -> BulkSchemaOut[SubmenuSchemaOut]:
+        created, updated, deleted = await self.__repo.bulk_write(
+            bulk_data.create, bulk_data.update, bulk_data.delete, menu_id
+        )
+        submenu_ids = [row['id'] for row in created + updated] + deleted
+        cache_keys = ['catalog', *(f'submenus:{menu_id}:{submenu_id}' for submenu_id in submenu_ids)]
+        cache_scopes = [f'submenus-list:{menu_id}', *(f'submenu:{submenu_id}' for submenu_id in deleted)]
+
+        if created or deleted:
+            cache_keys.append(f'menus:{menu_id}')
+            cache_scopes.append('menus-list')
+
+        self.__bg_tasks.add_task(self.__cache.delete, *cache_keys)
+        self.__bg_tasks.add_task(self.__cache.invalidate, *cache_scopes)
+
+        return BulkSchemaOut[SubmenuSchemaOut](created=created, updated=updated, deleted=deleted)
+
+    async def __load(self, menu_id: UUID, submenu_id: UUID) -> bytes | None:
+        submenu = await self.__repo.get(SubmenuSpecification(menu_id, submenu_id))
+
+        return None if submenu is None else submenu_adapter.dump_json(submenu_adapter.validate_python(submenu))
+
+    async def __load_list(self, menu_id: UUID, limit: int, after: UUID | None) -> bytes:
+        submenus = await self.__repo.get_list(SubmenuListSpecification(menu_id), limit, after)
+
+        return submenus_adapter.dump_json(submenus_adapter.validate_python(submenus))
@@ -0,0 +1,80 @@
+import asyncio
+import functools
+import logging
+from typing import Awaitable, Callable
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTasks
+
+from app.cache import RedisCache
+from app.config import CACHE_WARMUP_CONCURRENCY, PAGE_SIZE
+from app.database import get_async_session_cm, get_redis_session_cm
+from app.repositories import DishesRepository, MenuRepository, SubmenuRepository
+from app.services.dishes import DishesService
+from app.services.menus import CatalogService, MenuService
+from app.services.submenus import SubmenuService
+
+logger = logging.getLogger(__name__)
+
+Load = Callable[[AsyncSession, RedisCache], Awaitable[object]]
+
+
+class WarmUpService:
+    """Loads the entries read first by the clients into the cache, unless they are cached already"""
+
+    def __init__(self, concurrency: int = CACHE_WARMUP_CONCURRENCY):
+        self.db_session = get_async_session_cm
+        self.redis_session = get_redis_session_cm
+        self.__semaphore = asyncio.Semaphore(concurrency)
+
+    async def execute(self) -> int:
+        """Returns the number of the entries failed to load, which are logged"""
+        async with self.db_session() as db:
+            menus = await MenuRepository(db).get_content_hashes()
+            submenus = await SubmenuRepository(db).get_content_hashes()
+
+        loads: list[Load] = [self.__load_menus, self.__load_catalog]
+        loads += [functools.partial(self.__load_menu, menu['id']) for menu in menus]
+        loads += [functools.partial(self.__load_submenu, submenu['menu_id'], submenu['id']) for submenu in submenus]
+
+        results = await asyncio.gather(*(self.__run(load) for load in loads), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+
+        for error in errors:
+            logger.warning('Cache warm-up load failed', exc_info=error)
+
+        return len(errors)
+
+    async def __run(self, load: Load) -> None:
+        async with self.__semaphore, self.db_session() as db, self.redis_session() as redis:
+            await load(db, RedisCache(redis))
+
+    @staticmethod
+    async def __load_menus(db: AsyncSession, cache: RedisCache) -> None:
+        await MenuService(BackgroundTasks(), MenuRepository(db), cache).get_list(PAGE_SIZE)
+
+    @staticmethod
+    async def __load_catalog(db: AsyncSession, cache: RedisCache) -> None:
+        await CatalogService(MenuRepository(db), cache).get_catalog_json()
+
+    @staticmethod
+    async def __load_menu(menu_id: UUID, db: AsyncSession, cache: RedisCache) -> None:
+        await MenuService(BackgroundTasks(), MenuRepository(db), cache).get_by_id(menu_id)
+        await SubmenuService(BackgroundTasks(), SubmenuRepository(db), cache).get_list(menu_id, PAGE_SIZE)
+
+    @staticmethod
+    async def __load_submenu(menu_id: UUID, submenu_id: UUID, db: AsyncSession, cache: RedisCache) -> None:
+        await DishesService(BackgroundTasks(), DishesRepository(db), cache).get_list(menu_id, submenu_id, PAGE_SIZE)
+
+
+async def warm_up_cache() -> None:
+    """Runs the warm-up, logging instead of raising its errors, e.g. to run it in the background"""
+    try:
+        failed = await WarmUpService().execute()
+    except Exception:
+        logger.exception('Cache warm-up failed')
+
+        return
+
+    logger.info('Cache warm-up finished, %d entries failed to load', failed)
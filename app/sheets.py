@@ -0,0 +1,76 @@
+import csv
+import os
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Iterator
+from uuid import UUID
+
+import openpyxl
+
+COLUMNS_COUNT = 6
+PRICE_QUANT = Decimal('0.01')
+
+Row = tuple[Any, ...]
+
+
+def read_rows(filename: str) -> Iterator[Row]:
+    """Yields the rows of the sheet padded to six columns, with empty cells as None"""
+    readers = {'.xlsx': _read_xlsx_rows, '.csv': _read_csv_rows, '.parquet': _read_parquet_rows}
+    extension = os.path.splitext(filename)[1].lower()
+
+    if extension not in readers:
+        raise ValueError(f'Unsupported sheet format: {filename}')
+
+    for row in readers[extension](filename):
+        row = (*row[:COLUMNS_COUNT], *(None,) * (COLUMNS_COUNT - len(row)))
+
+        yield tuple(None if value == '' else value for value in row)
+
+
+def read_catalog(filename: str) -> Iterator[tuple[str, dict[str, Any]]]:
+    """Yields the ('menu' | 'submenu' | 'dish', item) pairs of the complete rows of the sheet"""
+    menu_id, submenu_id = None, None
+
+    for row in read_rows(filename):
+        if _is_complete(row[0:3]):
+            menu_id = UUID(str(row[0]))
+
+            yield 'menu', {'id': menu_id, 'title': row[1], 'description': row[2]}
+        elif menu_id is not None and _is_complete(row[1:4]):
+            submenu_id = UUID(str(row[1]))
+
+            yield 'submenu', {'id': submenu_id, 'menu_id': menu_id, 'title': row[2], 'description': row[3]}
+        elif menu_id is not None and _is_complete(row[2:6]):
+            yield 'dish', {
+                'id': UUID(str(row[2])),
+                'submenu_id': submenu_id,
+                'menu_id': menu_id,
+                'title': row[3],
+                'description': row[4],
+                'price': Decimal(str(row[5])).quantize(PRICE_QUANT, ROUND_HALF_UP),
+            }
+
+
+def _is_complete(cells: Row) -> bool:
+    return all(value is not None for value in cells)
+
+
+def _read_xlsx_rows(filename: str) -> Iterator[Row]:
+    workbook = openpyxl.load_workbook(filename, read_only=True, data_only=True)
+
+    try:
+        if (sheet := workbook.active) is not None:
+            yield from sheet.iter_rows(max_col=COLUMNS_COUNT, values_only=True)
+    finally:
+        workbook.close()
+
+
+def _read_csv_rows(filename: str) -> Iterator[Row]:
+    with open(filename, newline='', encoding='utf-8') as file:
+        yield from (tuple(row) for row in csv.reader(file))
+
+
+def _read_parquet_rows(filename: str) -> Iterator[Row]:
+    import pyarrow.parquet as pq  # type: ignore[import]
+
+    for batch in pq.ParquetFile(filename).iter_batches():
+        yield from zip(*(column.to_pylist() for column in batch.columns))
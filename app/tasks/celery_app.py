@@ -1,13 +1,15 @@
 from celery import Celery
 
-from app.config import RMQ_HOST, RMQ_PASSWORD, RMQ_PORT, RMQ_USER
+from app.config import RMQ_HOST, RMQ_PASSWORD, RMQ_PORT, RMQ_USER, SYNC_INTERVAL
 
 celery_app = Celery('tasks', broker=f'amqp://{RMQ_USER}:{RMQ_PASSWORD}@{RMQ_HOST}:{RMQ_PORT}', backend='rpc://')
 
 celery_app.conf.beat_schedule = {
     'test': {
         'task': 'app.tasks.tasks.sync_database_from_xlsx',
-        'schedule': 15,
+        'schedule': SYNC_INTERVAL,
+        # A beat not picked up before the next one is dropped instead of queued behind a slow sync
+        'options': {'expires': SYNC_INTERVAL},
     }
 }
 celery_app.autodiscover_tasks(['app.tasks.tasks'])
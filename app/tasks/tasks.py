@@ -1,13 +1,41 @@
 import asyncio
 
+from celery.signals import worker_process_shutdown  # type: ignore[import]
+from celery.utils.log import get_task_logger  # type: ignore[import]
+
 from app.config import XLSX_PATH
+from app.database import close_async_engine, close_redis_client
 from app.services.admin import AdminService
 from app.tasks.celery_app import celery_app
 
+logger = get_task_logger(__name__)
+event_loop: asyncio.AbstractEventLoop | None = None
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Returns the event loop of the worker process, created on first use"""
+    global event_loop
+
+    if event_loop is None or event_loop.is_closed():
+        event_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(event_loop)
+
+    return event_loop
+
+
+@worker_process_shutdown.connect
+def close_event_loop(**kwargs) -> None:
+    if event_loop is None or event_loop.is_closed():
+        return
+
+    event_loop.run_until_complete(close_async_engine())
+    event_loop.run_until_complete(close_redis_client())
+    event_loop.close()
+
 
-@celery_app.task
-def sync_database_from_xlsx() -> None:
-    loop = asyncio.get_event_loop()
+@celery_app.task(ignore_result=True)
+def sync_database_from_xlsx(force: bool = False) -> None:
     service = AdminService(XLSX_PATH)
 
-    loop.run_until_complete(service.execute())
+    if not get_event_loop().run_until_complete(service.execute(force)):
+        logger.info('Sync of %s is already running, skipped', XLSX_PATH)
@@ -1,7 +1,88 @@
-from typing import Any
+from typing import Any, Iterable
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.database import CONSISTENCY_TOKEN_HEADER, issue_consistency_token, track_writes
 
 
 def reverse(fastapi_app: FastAPI, name: str, **params: Any) -> str:
     return fastapi_app.url_path_for(name, **params)
+
+
+def negotiate_encoding(accept_encoding: str, encodings: Iterable[str]) -> str | None:
+    """Returns the first of the encodings acceptable according to the Accept-Encoding header"""
+    weights = {}
+
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        weight = 1.0
+
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+
+            if name == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+
+        weights[coding.strip().lower()] = weight
+
+    for encoding in encodings:
+        if weights.get(encoding, weights.get('*', 0.0)) > 0:
+            return encoding
+
+    return None
+
+
+class RawJSONResponse(Response):
+    """Response with an already serialized JSON body"""
+    media_type = 'application/json'
+
+
+class ETagMiddleware:
+    """Adds the ETag of the cached payload served by the request (`request.state.etag`) to its 200 response"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+
+            return
+
+        async def send_with_etag(message: Message) -> None:
+            if message['type'] == 'http.response.start' and message['status'] == 200:
+                etag = scope.get('state', {}).get('etag')
+
+                if etag is not None:
+                    MutableHeaders(scope=message).append('ETag', etag)
+
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
+
+
+class ConsistencyTokenMiddleware:
+    """Returns the signed WAL position of the writes of the request as its consistency token"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+
+            return
+
+        with track_writes() as state:
+            async def send_with_token(message: Message) -> None:
+                if message['type'] == 'http.response.start' and state.lsn is not None:
+                    MutableHeaders(scope=message).append(CONSISTENCY_TOKEN_HEADER, issue_consistency_token(state.lsn))
+
+                await send(message)
+
+            await self.app(scope, receive, send_with_token)
@@ -0,0 +1,122 @@
+"""Per-hit CPU cost of serving /catalog and /menus from the cache
+
+Compares the former hit path (JSON decoding, pydantic validation of every item, then response_model
+validation and serialization by FastAPI) with serving the cached response body as is. The cache is
+an in-memory dict, so only the CPU spent in the process is measured:
+
+    python -m benchmarks.cache_hit --menus 10 --submenus 10 --dishes 20 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from decimal import Decimal
+from typing import Any
+
+from fastapi import FastAPI
+from httpx import AsyncClient
+from pydantic import TypeAdapter
+
+from app.schemas import MenuCatalogSchemaOut, MenuSchemaOut
+from app.utils import RawJSONResponse
+
+
+def generate_catalog(menus: int, submenus: int, dishes: int) -> list[dict[str, Any]]:
+    return [
+        {
+            'id': uuid.uuid4(),
+            'title': f'Menu {i}',
+            'description': f'Menu description {i}',
+            'submenus': [
+                {
+                    'id': uuid.uuid4(),
+                    'title': f'Submenu {j}',
+                    'description': f'Submenu description {j}',
+                    'dishes': [
+                        {
+                            'id': uuid.uuid4(),
+                            'title': f'Dish {k}',
+                            'description': f'Dish description {k}',
+                            'price': Decimal('12.50'),
+                        }
+                        for k in range(dishes)
+                    ],
+                }
+                for j in range(submenus)
+            ],
+        }
+        for i in range(menus)
+    ]
+
+
+def create_app(catalog: list[dict[str, Any]]) -> FastAPI:
+    catalog_adapter = TypeAdapter(list[MenuCatalogSchemaOut])
+    menus_adapter = TypeAdapter(list[MenuSchemaOut])
+    menus = [
+        {
+            **menu,
+            'submenus_count': len(menu['submenus']),
+            'dishes_count': sum(len(submenu['dishes']) for submenu in menu['submenus']),
+        }
+        for menu in catalog
+    ]
+    cache = {
+        'catalog': catalog_adapter.dump_json(catalog_adapter.validate_python(catalog)),
+        'menus': menus_adapter.dump_json(menus_adapter.validate_python(menus)),
+    }
+    bench_app = FastAPI()
+
+    @bench_app.get('/before/catalog', response_model=list[MenuCatalogSchemaOut])
+    async def catalog_before() -> list[MenuCatalogSchemaOut]:
+        return list(map(MenuCatalogSchemaOut.model_validate, json.loads(cache['catalog'])))
+
+    @bench_app.get('/after/catalog', response_model=list[MenuCatalogSchemaOut])
+    async def catalog_after() -> RawJSONResponse:
+        return RawJSONResponse(cache['catalog'])
+
+    @bench_app.get('/before/menus', response_model=list[MenuSchemaOut])
+    async def menus_before() -> list[MenuSchemaOut]:
+        return list(map(MenuSchemaOut.model_validate, json.loads(cache['menus'])))
+
+    @bench_app.get('/after/menus', response_model=list[MenuSchemaOut])
+    async def menus_after() -> RawJSONResponse:
+        return RawJSONResponse(cache['menus'])
+
+    return bench_app
+
+
+async def measure(client: AsyncClient, path: str, requests: int) -> float:
+    """Returns the average CPU time of a request in microseconds"""
+    for _ in range(min(requests, 100)):
+        await client.get(path)
+
+    started = time.process_time()
+
+    for _ in range(requests):
+        await client.get(path)
+
+    return (time.process_time() - started) / requests * 1e6
+
+
+async def main(args: argparse.Namespace) -> None:
+    bench_app = create_app(generate_catalog(args.menus, args.submenus, args.dishes))
+
+    async with AsyncClient(app=bench_app, base_url='http://bench') as client:
+        print(f'{"endpoint":<12}{"before, us":>14}{"after, us":>14}{"speedup":>10}')
+
+        for endpoint in ('catalog', 'menus'):
+            before = await measure(client, f'/before/{endpoint}', args.requests)
+            after = await measure(client, f'/after/{endpoint}', args.requests)
+
+            print(f'{endpoint:<12}{before:>14.1f}{after:>14.1f}{before / after:>9.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--menus', type=int, default=10)
+    parser.add_argument('--submenus', type=int, default=10)
+    parser.add_argument('--dishes', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=1000)
+
+    asyncio.run(main(parser.parse_args()))
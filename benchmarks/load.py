@@ -0,0 +1,175 @@
+"""Throughput and latency of the API endpoints with a cold and a warm cache
+
+Seeds a synthetic catalog into the database configured for the app (POSTGRES_* and REDIS_*
+variables, migrated with alembic) and drives app.main:app in-process with concurrent async
+clients, so that no server or external service is involved:
+
+    python -m benchmarks.load --menus 20 --submenus 10 --dishes 20 --requests 2000 --concurrency 32
+
+The cold pass requests every URL of the seeded catalog once right after invalidating its cache
+entries, the warm pass requests random URLs afterwards. RPS and p50/p95/p99 latencies per endpoint
+are printed and written as JSON to --output, to compare runs over time. The seeded rows are
+deleted at the end.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import math
+import random
+import subprocess
+import time
+from typing import Any
+
+import httpx
+
+from app.cache import RedisCache
+from app.database import close_async_engine, close_redis_client, get_async_engine, get_redis_client
+from app.main import app
+from benchmarks.seed import Catalog, delete_catalog, generate_catalog, insert_catalog
+
+BASE_URL = 'http://localhost/api/v1'
+
+
+async def seed_catalog(menus_count: int, submenus_count: int, dishes_count: int) -> Catalog:
+    catalog = generate_catalog(menus_count, submenus_count, dishes_count)
+
+    async with get_async_engine().begin() as conn:
+        await insert_catalog(conn, catalog)
+
+    return catalog
+
+
+async def remove_catalog(catalog: Catalog) -> None:
+    async with get_async_engine().begin() as conn:
+        await delete_catalog(conn, catalog)
+
+
+async def invalidate_catalog(catalog: Catalog) -> None:
+    scopes = ['menus-list', 'catalog']
+
+    for menu in catalog['menus']:
+        scopes += f'menu:{menu["id"]}', f'menus:{menu["id"]}'
+
+    await RedisCache(get_redis_client()).invalidate(*scopes)
+
+
+def get_urls(catalog: Catalog) -> list[tuple[str, str]]:
+    """Returns the (endpoint, url) pairs of every entity and list of the catalog"""
+    urls = [('menus', '/menus'), ('catalog', '/catalog')]
+
+    for menu in catalog['menus']:
+        urls += ('menu', f'/menus/{menu["id"]}'), ('submenus', f'/menus/{menu["id"]}/submenus')
+
+    for submenu in catalog['submenus']:
+        url = f'/menus/{submenu["menu_id"]}/submenus/{submenu["id"]}'
+        urls += ('submenu', url), ('dishes', f'{url}/dishes')
+
+    for dish in catalog['dishes']:
+        urls.append(('dish', f'/menus/{dish["menu_id"]}/submenus/{dish["submenu_id"]}/dishes/{dish["id"]}'))
+
+    return urls
+
+
+async def run(client: httpx.AsyncClient, urls: list[tuple[str, str]], concurrency: int) -> dict[str, Any]:
+    """Requests the urls with `concurrency` clients, returns the stats per endpoint"""
+    latencies: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    pending = iter(urls)
+
+    async def worker() -> None:
+        for endpoint, url in pending:
+            started_at = time.perf_counter()
+            response = await client.get(url)
+            latencies.setdefault(endpoint, []).append(time.perf_counter() - started_at)
+
+            if response.status_code != 200:
+                errors[endpoint] = errors.get(endpoint, 0) + 1
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started_at
+
+    result = {endpoint: get_stats(values, elapsed, errors.get(endpoint, 0)) for endpoint, values in latencies.items()}
+    result['total'] = get_stats([v for values in latencies.values() for v in values], elapsed, sum(errors.values()))
+
+    return result
+
+
+def get_stats(latencies: list[float], elapsed: float, errors: int) -> dict[str, float]:
+    """Returns the requests count, the requests per second of the run and the nearest-rank latency percentiles in ms"""
+    latencies = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        return round(latencies[max(0, math.ceil(len(latencies) * p) - 1)] * 1000, 2)
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+    }
+
+
+def print_stats(name: str, stats: dict[str, dict[str, float]]) -> None:
+    print(f'\n{name}')
+    print(f'{"endpoint":<12}{"requests":>10}{"errors":>8}{"rps":>10}{"p50, ms":>10}{"p95, ms":>10}{"p99, ms":>10}')
+
+    for endpoint, row in stats.items():
+        print(
+            f'{endpoint:<12}{row["requests"]:>10}{row["errors"]:>8}{row["rps"]:>10}'
+            f'{row["p50_ms"]:>10}{row["p95_ms"]:>10}{row["p99_ms"]:>10}'
+        )
+
+
+def get_revision() -> str | None:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args: argparse.Namespace) -> None:
+    random.seed(args.seed)
+    catalog = await seed_catalog(args.menus, args.submenus, args.dishes)
+
+    try:
+        urls = get_urls(catalog)
+
+        async with httpx.AsyncClient(app=app, base_url=BASE_URL) as client:
+            await invalidate_catalog(catalog)
+            cold = await run(client, random.sample(urls, len(urls)), args.concurrency)
+            warm = await run(client, random.choices(urls, k=args.requests), args.concurrency)
+    finally:
+        await remove_catalog(catalog)
+        await close_redis_client()
+        await close_async_engine()
+
+    print_stats('cold cache', cold)
+    print_stats('warm cache', warm)
+
+    result = {
+        'finished_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'revision': get_revision(),
+        'params': vars(args),
+        'cold': cold,
+        'warm': warm,
+    }
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(result, file, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--menus', type=int, default=20)
+    parser.add_argument('--submenus', type=int, default=10)
+    parser.add_argument('--dishes', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='load-results.json')
+
+    asyncio.run(main(parser.parse_args()))
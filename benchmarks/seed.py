@@ -0,0 +1,46 @@
+"""Synthetic catalog rows, seeded by the load benchmark and the query plans tests"""
+import uuid
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.models import Dish, Menu, Submenu
+
+Catalog = dict[str, list[dict[str, Any]]]
+
+
+def generate_catalog(menus_count: int, submenus_count: int, dishes_count: int) -> Catalog:
+    """Returns the rows of the menus, of their submenus and of their dishes, which carry their menu_id as well"""
+    menus = [
+        {'id': uuid.uuid4(), 'title': f'Menu {i}', 'description': f'Menu description {i}'}
+        for i in range(menus_count)
+    ]
+    submenus = [
+        {'id': uuid.uuid4(), 'menu_id': menu['id'], 'title': f'Submenu {i}', 'description': f'Submenu description {i}'}
+        for menu in menus for i in range(submenus_count)
+    ]
+    dishes = [
+        {
+            'id': uuid.uuid4(),
+            'submenu_id': submenu['id'],
+            'menu_id': submenu['menu_id'],
+            'title': f'Dish {i}',
+            'description': f'Dish description {i}',
+            'price': Decimal('12.50'),
+        }
+        for submenu in submenus for i in range(dishes_count)
+    ]
+
+    return {'menus': menus, 'submenus': submenus, 'dishes': dishes}
+
+
+async def insert_catalog(conn: AsyncConnection, catalog: Catalog) -> None:
+    await conn.execute(insert(Menu), catalog['menus'])
+    await conn.execute(insert(Submenu), catalog['submenus'])
+    await conn.execute(insert(Dish), [{k: v for k, v in dish.items() if k != 'menu_id'} for dish in catalog['dishes']])
+
+
+async def delete_catalog(conn: AsyncConnection, catalog: Catalog) -> None:
+    await conn.execute(delete(Menu).where(Menu.id.in_([menu['id'] for menu in catalog['menus']])))
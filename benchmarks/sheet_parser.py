@@ -0,0 +1,97 @@
+"""Time and peak memory of parsing the catalog sheet in every supported format
+
+Generates a sheet with the given number of dishes as xlsx, csv and parquet files in a temporary
+directory, then reads each of them with app.sheets.read_catalog:
+
+    python -m benchmarks.sheet_parser --dishes 100000 --submenus 10 --dishes-per-submenu 20
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+from typing import Any, Iterator
+
+import openpyxl
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.sheets import COLUMNS_COUNT, read_catalog
+
+
+def generate_rows(dishes: int, submenus: int, dishes_per_submenu: int) -> Iterator[list[Any]]:
+    for i in range(0, dishes, submenus * dishes_per_submenu):
+        yield [str(uuid.uuid4()), f'Menu {i}', f'Menu description {i}', None, None, None]
+
+        for j in range(submenus):
+            yield [None, str(uuid.uuid4()), f'Submenu {j}', f'Submenu description {j}', None, None]
+
+            for k in range(dishes_per_submenu):
+                yield [None, None, str(uuid.uuid4()), f'Dish {k}', f'Dish description {k}', '12.50']
+
+
+def write_xlsx(filename: str, rows: list[list[Any]]) -> None:
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+
+    for row in rows:
+        sheet.append(row)
+
+    workbook.save(filename)
+
+
+def write_csv(filename: str, rows: list[list[Any]]) -> None:
+    with open(filename, 'w', newline='', encoding='utf-8') as file:
+        csv.writer(file).writerows(rows)
+
+
+def write_parquet(filename: str, rows: list[list[Any]]) -> None:
+    columns = {f'column_{i}': [row[i] for row in rows] for i in range(COLUMNS_COUNT)}
+
+    pq.write_table(pa.table(columns), filename)
+
+
+def measure(filename: str) -> tuple[int, float, float]:
+    """Returns the items count, the parse time in seconds and the peak of allocated memory in MiB"""
+    started = time.perf_counter()
+    items = sum(1 for _ in read_catalog(filename))
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+
+    for _ in read_catalog(filename):
+        pass
+
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return items, elapsed, peak / 1024 / 1024
+
+
+def main(args: argparse.Namespace) -> None:
+    rows = list(generate_rows(args.dishes, args.submenus, args.dishes_per_submenu))
+    writers = {'xlsx': write_xlsx, 'csv': write_csv, 'parquet': write_parquet}
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f'{"format":<10}{"size, MiB":>12}{"items":>10}{"time, s":>10}{"peak, MiB":>12}')
+
+        for extension, write in writers.items():
+            filename = os.path.join(directory, f'Menu.{extension}')
+
+            write(filename, rows)
+
+            size = os.path.getsize(filename) / 1024 / 1024
+            items, elapsed, peak = measure(filename)
+
+            print(f'{extension:<10}{size:>12.1f}{items:>10}{elapsed:>10.2f}{peak:>12.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dishes', type=int, default=100_000)
+    parser.add_argument('--submenus', type=int, default=10)
+    parser.add_argument('--dishes-per-submenu', type=int, default=20)
+
+    main(parser.parse_args())
@@ -0,0 +1,98 @@
+"""add counters
+
+Revision ID: 5b1f2c7d9e34
+Revises: 02f9f3e4df84
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '5b1f2c7d9e34'
+down_revision = '02f9f3e4df84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('menu', sa.Column('submenus_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.add_column('menu', sa.Column('dishes_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.add_column('submenu', sa.Column('dishes_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.execute("""
+        CREATE OR REPLACE FUNCTION submenu_counters() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                UPDATE menu
+                SET submenus_count = submenus_count - 1, dishes_count = dishes_count - OLD.dishes_count
+                WHERE id = OLD.menu_id;
+            END IF;
+
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE menu
+                SET submenus_count = submenus_count + 1, dishes_count = dishes_count + NEW.dishes_count
+                WHERE id = NEW.menu_id;
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION dish_counters() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                WITH updated AS (
+                    UPDATE submenu SET dishes_count = dishes_count - 1 WHERE id = OLD.submenu_id RETURNING menu_id
+                )
+                UPDATE menu SET dishes_count = dishes_count - 1 WHERE id IN (SELECT menu_id FROM updated);
+            END IF;
+
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                WITH updated AS (
+                    UPDATE submenu SET dishes_count = dishes_count + 1 WHERE id = NEW.submenu_id RETURNING menu_id
+                )
+                UPDATE menu SET dishes_count = dishes_count + 1 WHERE id IN (SELECT menu_id FROM updated);
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER submenu_counters AFTER INSERT OR DELETE ON submenu
+        FOR EACH ROW EXECUTE FUNCTION submenu_counters()
+    """)
+    op.execute("""
+        CREATE TRIGGER submenu_counters_move AFTER UPDATE OF menu_id ON submenu
+        FOR EACH ROW WHEN (OLD.menu_id IS DISTINCT FROM NEW.menu_id) EXECUTE FUNCTION submenu_counters()
+    """)
+    op.execute("""
+        CREATE TRIGGER dish_counters AFTER INSERT OR DELETE ON dish
+        FOR EACH ROW EXECUTE FUNCTION dish_counters()
+    """)
+    op.execute("""
+        CREATE TRIGGER dish_counters_move AFTER UPDATE OF submenu_id ON dish
+        FOR EACH ROW WHEN (OLD.submenu_id IS DISTINCT FROM NEW.submenu_id) EXECUTE FUNCTION dish_counters()
+    """)
+    op.execute("""
+        UPDATE submenu
+        SET dishes_count = (SELECT count(*) FROM dish WHERE dish.submenu_id = submenu.id)
+    """)
+    op.execute("""
+        UPDATE menu
+        SET submenus_count = (SELECT count(*) FROM submenu WHERE submenu.menu_id = menu.id),
+            dishes_count = (SELECT coalesce(sum(dishes_count), 0) FROM submenu WHERE submenu.menu_id = menu.id)
+    """)
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER dish_counters_move ON dish')
+    op.execute('DROP TRIGGER dish_counters ON dish')
+    op.execute('DROP TRIGGER submenu_counters_move ON submenu')
+    op.execute('DROP TRIGGER submenu_counters ON submenu')
+    op.execute('DROP FUNCTION dish_counters()')
+    op.execute('DROP FUNCTION submenu_counters()')
+    op.drop_column('submenu', 'dishes_count')
+    op.drop_column('menu', 'dishes_count')
+    op.drop_column('menu', 'submenus_count')
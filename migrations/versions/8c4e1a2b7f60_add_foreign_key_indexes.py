@@ -0,0 +1,24 @@
+"""add foreign key indexes
+
+Revision ID: 8c4e1a2b7f60
+Revises: 5b1f2c7d9e34
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '8c4e1a2b7f60'
+down_revision = '5b1f2c7d9e34'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_submenu_menu_id_id', 'submenu', ['menu_id', 'id'], unique=False)
+    op.create_index('ix_dish_submenu_id_id', 'dish', ['submenu_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_dish_submenu_id_id', table_name='dish')
+    op.drop_index('ix_submenu_menu_id_id', table_name='submenu')
@@ -0,0 +1,41 @@
+"""add content hashes
+
+Revision ID: d27a9c4e5b81
+Revises: 8c4e1a2b7f60
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'd27a9c4e5b81'
+down_revision = '8c4e1a2b7f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('menu', sa.Column(
+        'content_hash', sa.String(length=32),
+        sa.Computed('md5(title::text || chr(31) || description::text)', persisted=True), nullable=False
+    ))
+    op.add_column('submenu', sa.Column(
+        'content_hash', sa.String(length=32),
+        sa.Computed('md5(menu_id::text || chr(31) || title::text || chr(31) || description::text)', persisted=True),
+        nullable=False
+    ))
+    op.add_column('dish', sa.Column(
+        'content_hash', sa.String(length=32),
+        sa.Computed(
+            'md5(submenu_id::text || chr(31) || title::text || chr(31) || description::text || chr(31) || price::text)',
+            persisted=True
+        ),
+        nullable=False
+    ))
+
+
+def downgrade() -> None:
+    op.drop_column('dish', 'content_hash')
+    op.drop_column('submenu', 'content_hash')
+    op.drop_column('menu', 'content_hash')
@@ -1,6 +1,7 @@
 import asyncio
+import contextlib
 import dataclasses
-from typing import Any, AsyncGenerator, AsyncIterator, Generator
+from typing import Any, AsyncGenerator, AsyncIterator, Generator, Iterator
 
 import pytest
 import pytest_asyncio
@@ -19,12 +20,14 @@ from app.config import (
 )
 from app.database import get_async_session, get_redis_session
 from app.main import app
+from app.metrics import QueryStats, instrument_engine, track_queries
 from app.models import BaseModel
 
 DB_TEST_URL_ASYNC = f'postgresql+asyncpg://{DB_USER_TEST}:{DB_PASS_TEST}@{DB_HOST_TEST}:{DB_PORT_TEST}/{DB_NAME_TEST}'
 REDIS_URL = f'redis://{REDIS_HOST_TEST}:{REDIS_PORT_TEST}'
 
 async_engine = create_async_engine(DB_TEST_URL_ASYNC)
+instrument_engine(async_engine)
 
 
 @dataclasses.dataclass
@@ -39,6 +42,15 @@ class DishState(State):
     price: str | None = None
 
 
+@contextlib.contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryStats]:
+    """Fails the test if the statements run within the block, e.g. by a request, are more than `limit`"""
+    with track_queries(keep_statements=True) as stats:
+        yield stats
+
+    assert stats.count <= limit, f'{stats.count} queries, expected at most {limit}:\n' + '\n'.join(stats.statements)
+
+
 async def override_get_async_session() -> AsyncSession:
     async_session = async_sessionmaker(async_engine)
 
@@ -0,0 +1,191 @@
+import contextlib
+import csv
+import os
+import uuid
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from prometheus_client import REGISTRY
+from sqlalchemy import delete, select, update
+
+from app.models import Dish, Menu, Submenu
+from app.services.admin import LOCK_KEY, AdminService
+from tests.conftest import (
+    assert_max_queries,
+    async_engine,
+    override_get_async_session,
+    override_get_redis_session,
+)
+
+# Menus as (id, title, submenus), submenus as (id, title, dishes) and dishes as (id, title, price)
+Sheet = list[tuple[str, str, list[tuple[str, str, list[tuple[str, str, str]]]]]]
+
+ENTITIES = 'menu', 'submenu', 'dish'
+OPERATIONS = 'insert', 'update', 'delete'
+
+
+# The sync deletes every row missing from the sheet, rows of other tests included
+@pytest_asyncio.fixture(name='ids')
+async def get_ids() -> AsyncGenerator[dict[str, str], Any]:
+    ids = {name: str(uuid.uuid4()) for name in ('menu_a', 'menu_b', 'menu_c')}
+    ids.update((f'submenu_{i}', str(uuid.uuid4())) for i in range(1, 5))
+    ids.update((f'dish_{i}', str(uuid.uuid4())) for i in range(1, 6))
+
+    yield ids
+
+    async with async_engine.begin() as conn:
+        await conn.execute(delete(Menu).where(Menu.id.in_([ids['menu_a'], ids['menu_b'], ids['menu_c']])))
+
+
+def write_sheet(path: Path, sheet: Sheet) -> None:
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+
+        for menu_id, menu_title, submenus in sheet:
+            writer.writerow([menu_id, menu_title, f'{menu_title} description'])
+
+            for submenu_id, submenu_title, dishes in submenus:
+                writer.writerow(['', submenu_id, submenu_title, f'{submenu_title} description'])
+
+                for dish_id, dish_title, price in dishes:
+                    writer.writerow(['', '', dish_id, dish_title, f'{dish_title} description', price])
+
+
+def get_service(path: Path) -> AdminService:
+    service = AdminService(str(path))
+    service.db_session = contextlib.asynccontextmanager(override_get_async_session)
+    service.redis_session = contextlib.asynccontextmanager(override_get_redis_session)
+
+    return service
+
+
+def get_synced_rows() -> dict[tuple[str, str], float]:
+    return {
+        (entity, operation): REGISTRY.get_sample_value(
+            'sync_rows_total', {'entity': entity, 'operation': operation}
+        ) or 0.0
+        for entity in ENTITIES for operation in OPERATIONS
+    }
+
+
+async def get_rows(model: type[Menu | Submenu | Dish]) -> dict[str, Any]:
+    async with async_engine.connect() as conn:
+        return {str(row.id): row for row in await conn.execute(select(model))}
+
+
+@pytest.fixture(autouse=True)
+def skip_warmup(monkeypatch: pytest.MonkeyPatch) -> list[None]:
+    warmups = []
+
+    async def warm_up_cache() -> None:
+        warmups.append(None)
+
+    monkeypatch.setattr('app.services.admin.warm_up_cache', warm_up_cache)
+
+    return warmups
+
+
+@pytest.mark.asyncio
+async def test_admin_sync(
+        client: AsyncClient,
+        tmp_path: Path,
+        ids: dict[str, str],
+        skip_warmup: list[None]
+) -> None:
+    path = tmp_path / 'Menu.csv'
+    write_sheet(path, [
+        (ids['menu_a'], 'Menu A', [
+            (ids['submenu_1'], 'Submenu 1', [(ids['dish_1'], 'Dish 1', '10'), (ids['dish_2'], 'Dish 2', '20')]),
+            (ids['submenu_2'], 'Submenu 2', [(ids['dish_3'], 'Dish 3', '30')]),
+        ]),
+        (ids['menu_b'], 'Menu B', [
+            (ids['submenu_3'], 'Submenu 3', [(ids['dish_4'], 'Dish 4', '40')]),
+        ]),
+    ])
+
+    assert await get_service(path).execute()
+
+    menus, submenus, dishes = await get_rows(Menu), await get_rows(Submenu), await get_rows(Dish)
+
+    assert {ids['menu_a'], ids['menu_b']} <= set(menus)
+    assert (menus[ids['menu_a']].submenus_count, menus[ids['menu_a']].dishes_count) == (2, 3)
+    assert submenus[ids['submenu_1']].dishes_count == 2
+    assert dishes[ids['dish_1']].price == Decimal('10.00')
+
+    response = await client.get(f'/menus/{ids["menu_a"]}')
+
+    assert response.json()['title'] == 'Menu A'
+
+    # Menu A and dish 1 updated, dish 2 moved to submenu 2, menu B deleted with its children, menu C inserted
+    write_sheet(path, [
+        (ids['menu_a'], 'Menu A2', [
+            (ids['submenu_1'], 'Submenu 1', [(ids['dish_1'], 'Dish 1', '15.5')]),
+            (ids['submenu_2'], 'Submenu 2', [(ids['dish_3'], 'Dish 3', '30'), (ids['dish_2'], 'Dish 2', '20')]),
+        ]),
+        (ids['menu_c'], 'Menu C', [
+            (ids['submenu_4'], 'Submenu 4', [(ids['dish_5'], 'Dish 5', '50')]),
+        ]),
+    ])
+    synced_rows = get_synced_rows()
+
+    assert await get_service(path).execute()
+
+    synced_rows = {name: count - synced_rows[name] for name, count in get_synced_rows().items()}
+    menus, submenus, dishes = await get_rows(Menu), await get_rows(Submenu), await get_rows(Dish)
+
+    assert synced_rows == {
+        ('menu', 'insert'): 1, ('menu', 'update'): 1, ('menu', 'delete'): 1,
+        ('submenu', 'insert'): 1, ('submenu', 'update'): 0, ('submenu', 'delete'): 1,
+        ('dish', 'insert'): 1, ('dish', 'update'): 2, ('dish', 'delete'): 1,
+    }
+    assert ids['menu_b'] not in menus and ids['submenu_3'] not in submenus and ids['dish_4'] not in dishes
+    assert menus[ids['menu_a']].title == 'Menu A2'
+    assert (menus[ids['menu_a']].submenus_count, menus[ids['menu_a']].dishes_count) == (2, 3)
+    assert (menus[ids['menu_c']].submenus_count, menus[ids['menu_c']].dishes_count) == (1, 1)
+    assert submenus[ids['submenu_1']].dishes_count == 1
+    assert submenus[ids['submenu_2']].dishes_count == 2
+    assert str(dishes[ids['dish_2']].submenu_id) == ids['submenu_2']
+    assert dishes[ids['dish_1']].price == Decimal('15.50')
+    assert len(skip_warmup) == 2
+
+    response = await client.get(f'/menus/{ids["menu_a"]}')
+
+    assert response.json()['title'] == 'Menu A2'
+
+    async with async_engine.begin() as conn:
+        await conn.execute(update(Dish).where(Dish.id == ids['dish_1']).values(title='Dish 1 renamed'))
+
+    # The file is unchanged since the last sync
+    with assert_max_queries(0):
+        assert await get_service(path).execute()
+
+    assert (await get_rows(Dish))[ids['dish_1']].title == 'Dish 1 renamed'
+
+    assert await get_service(path).execute(force=True)
+
+    assert (await get_rows(Dish))[ids['dish_1']].title == 'Dish 1'
+    assert len(skip_warmup) == 3
+
+
+@pytest.mark.asyncio
+async def test_admin_sync_locked(tmp_path: Path, ids: dict[str, str]) -> None:
+    path = tmp_path / 'Menu.csv'
+    write_sheet(path, [(ids['menu_a'], 'Menu A', [])])
+
+    async with contextlib.asynccontextmanager(override_get_redis_session)() as redis:
+        lock = redis.lock(LOCK_KEY.format(os.path.abspath(path)), timeout=10)
+
+        assert await lock.acquire(blocking=False)
+
+        try:
+            assert not await get_service(path).execute()
+        finally:
+            await lock.release()
+
+    assert ids['menu_a'] not in await get_rows(Menu)
+    assert await get_service(path).execute()
+    assert ids['menu_a'] in await get_rows(Menu)
@@ -0,0 +1,266 @@
+import asyncio
+import json
+import uuid
+from typing import AsyncIterator
+
+import pytest
+import pytest_asyncio
+import redis.asyncio as redis
+
+from app.cache import (
+    LocalCache,
+    RedisCache,
+    inflight_loads,
+    patch_catalog,
+    replace_list_item,
+)
+from app.database import track_writes
+from tests.conftest import REDIS_URL
+
+
+class CountingLoader:
+    """Loader returning its calls count as the payload, after a delay letting concurrent callers pile up"""
+
+    def __init__(self, delay: float = 0.1):
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self) -> bytes:
+        self.calls += 1
+
+        await asyncio.sleep(self.delay)
+
+        return str(self.calls).encode()
+
+
+@pytest_asyncio.fixture(name='redis_session')
+async def get_redis_session() -> AsyncIterator[redis.Redis]:
+    async with redis.from_url(REDIS_URL) as session:
+        yield session
+
+
+def test_local_cache_evicts_least_recently_used() -> None:
+    cache = LocalCache(max_items=2, max_bytes=1024, ttl=60)
+
+    cache.set('menus', [], 2)
+    cache.set('catalog', [], 2)
+    cache.get('menus')
+    cache.set('menus:1', {}, 2)
+
+    assert cache.get('catalog') is None
+    assert cache.get('menus') == []
+    assert cache.get('menus:1') == {}
+
+
+def test_local_cache_respects_memory_cap() -> None:
+    cache = LocalCache(max_items=10, max_bytes=10, ttl=60)
+
+    cache.set('menus', [], 8)
+    cache.set('catalog', [], 8)
+    cache.set('menus:1', {}, 100)
+
+    assert cache.get('menus') is None
+    assert cache.get('catalog') == []
+    assert cache.get('menus:1') is None
+
+
+def test_local_cache_expires_entries() -> None:
+    cache = LocalCache(max_items=10, max_bytes=1024, ttl=-1)
+
+    cache.set('menus', [], 2)
+
+    assert cache.get('menus') is None
+
+
+def test_local_cache_deletes_keys() -> None:
+    cache = LocalCache(max_items=10, max_bytes=1024, ttl=60)
+
+    cache.set('submenus:1', [], 2)
+    cache.set('submenus:3', [], 2)
+    cache.delete('submenus:1')
+
+    assert cache.get('submenus:1') is None
+    assert cache.get('submenus:3') == []
+
+
+def test_replace_list_item() -> None:
+    items = [{'id': '1', 'title': 'Dish 1'}, {'id': '2', 'title': 'Dish 2'}]
+    patcher = replace_list_item({'id': '2', 'title': 'Dish 3'})
+
+    patched = json.loads(patcher(json.dumps(items).encode()))
+
+    assert patched == [{'id': '1', 'title': 'Dish 1'}, {'id': '2', 'title': 'Dish 3'}]
+    assert json.loads(patcher(json.dumps(items[:1]).encode())) == items[:1]
+    assert patcher(None) is None
+
+
+def test_patch_catalog() -> None:
+    menu_id, submenu_id, dish_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    dish = {'id': str(dish_id), 'title': 'Dish', 'description': 'Dish', 'price': '1.00'}
+    submenu = {'id': str(submenu_id), 'title': 'Submenu', 'description': 'Submenu', 'dishes': [dish]}
+    catalog = json.dumps([{'id': str(menu_id), 'title': 'Menu', 'description': 'Menu', 'submenus': [submenu]}])
+    fields = {'id': str(dish_id), 'title': 'Dish', 'description': 'Dish', 'price': '2.00', 'dishes_count': 0}
+
+    patched = json.loads(patch_catalog(fields, menu_id, submenu_id, dish_id)(catalog.encode()))
+
+    assert patched[0]['submenus'][0]['dishes'][0] == {**dish, 'price': '2.00'}
+    assert patch_catalog({'title': 'Menu 2'}, menu_id)(catalog.encode()).count(b'Menu 2') == 1
+    assert patch_catalog(fields, uuid.uuid4())(catalog.encode()) is None
+
+
+@pytest.mark.asyncio
+async def test_cache_loads_cold_key_once(redis_session: redis.Redis) -> None:
+    cache = RedisCache(redis_session)
+    loader = CountingLoader()
+    key = f'menus:{uuid.uuid4()}'
+
+    results = await asyncio.gather(*(cache.get_or_load(key, loader) for _ in range(10)))
+
+    assert results == [b'1'] * 10
+    assert loader.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_waits_for_loading_process(redis_session: redis.Redis) -> None:
+    cache = RedisCache(redis_session)
+    loader, other_loader = CountingLoader(), CountingLoader()
+    key = f'menus:{uuid.uuid4()}'
+
+    loading = asyncio.create_task(cache.get_or_load(key, loader))
+    await asyncio.sleep(0.05)
+    # Another process does not share the loads in flight, only the Redis lock
+    inflight_loads.clear()
+
+    assert await cache.get_or_load(key, other_loader) == b'1'
+    assert await loading == b'1'
+    assert (loader.calls, other_loader.calls) == (1, 0)
+
+
+@pytest.mark.asyncio
+async def test_cache_serves_stale_entry_while_refreshing_once(
+        redis_session: redis.Redis,
+        monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr('app.cache.CACHE_SOFT_TTL', 60)
+    cache = RedisCache(redis_session)
+    loader = CountingLoader()
+    key = f'menus:{uuid.uuid4()}'
+
+    assert await cache.get_or_load(key, loader) == b'1'
+
+    await redis_session.delete(*await redis_session.keys(f'{key}@*#fresh'))
+    results = await asyncio.gather(*(cache.get_or_load(key, loader) for _ in range(10)))
+
+    assert results == [b'1'] * 10
+    assert loader.calls == 2
+    assert await cache.get_or_load(key, loader) == b'2'
+    assert loader.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_patch_deletes_keys_patched_concurrently(redis_session: redis.Redis) -> None:
+    cache = RedisCache(redis_session)
+    loader = CountingLoader(delay=0)
+    key = f'menus:{uuid.uuid4()}'
+
+    async def load_patches() -> dict:
+        # A later update patches the key first, once this one has read its row
+        await cache.patch([key], load_new_patches)
+
+        return {key: lambda _: b'old'}
+
+    async def load_new_patches() -> dict:
+        return {key: lambda _: b'new'}
+
+    await cache.patch([key], load_new_patches)
+
+    assert await cache.get_or_load(key, loader) == b'new'
+
+    await cache.patch([key], load_patches)
+
+    assert await cache.get_or_load(key, loader) == b'1'
+
+    await cache.patch([key], load_new_patches)
+    # The row is deleted meanwhile
+    await cache.patch([key], lambda: asyncio.sleep(0, None))
+
+    assert await cache.get_or_load(key, loader) == b'2'
+
+
+@pytest.mark.asyncio
+async def test_cache_patch_bumps_dropped_keys_after_replica(
+        redis_session: redis.Redis,
+        monkeypatch: pytest.MonkeyPatch
+) -> None:
+    waits = []
+
+    async def wait_for_replica(lsn: str) -> bool:
+        waits.append(lsn)
+
+        return True
+
+    monkeypatch.setattr('app.cache.wait_for_replica', wait_for_replica)
+    cache = RedisCache(redis_session)
+    written, dropped = f'menus:{uuid.uuid4()}', f'menus-page:{uuid.uuid4()}'
+
+    async def load_patches() -> dict:
+        return {written: lambda _: b'new', dropped: lambda _: None}
+
+    async def get_versions() -> list[int]:
+        return [int(version) for version in await redis_session.mget(f'version:{written}', f'version:{dropped}')]
+
+    await cache.patch([written, dropped], load_patches)
+    versions = await get_versions()
+
+    with track_writes() as state:
+        state.lsn = '0/1'
+        await cache.patch([written, dropped], load_patches)
+
+    assert waits == ['0/1']
+    assert [new - old for new, old in zip(await get_versions(), versions)] == [1, 2]
+    assert await cache.get_or_load(written, CountingLoader()) == b'new'
+
+
+@pytest.mark.asyncio
+async def test_cache_write_through_unindexes_dropped_pages(redis_session: redis.Redis) -> None:
+    cache = RedisCache(redis_session)
+    menu_id, submenu_id = uuid.uuid4(), uuid.uuid4()
+    key, pages = f'dishes:{menu_id}:{submenu_id}:1', [f'dishes-page:{menu_id}:{submenu_id}::{i}' for i in (1, 2)]
+
+    for page in pages:
+        await cache.get_or_load(page, lambda: asyncio.sleep(0, b'[{"id":"1","title":"Dish"}]'))
+
+    await cache.get_or_load(f'dishes-page:{menu_id}:{submenu_id}:2:1', lambda: asyncio.sleep(0, b'[]'))
+    # The first page expires
+    await redis_session.delete(*await redis_session.keys(f'{pages[0]}@*'))
+
+    assert sorted(await cache.get_indexed_keys('dishes-page', menu_id, submenu_id)) == pages
+
+    await cache.write_through(key, lambda: asyncio.sleep(0, b'{"id":"1","title":"Dish 2"}'))
+
+    assert await cache.get_indexed_keys('dishes-page', menu_id, submenu_id) == pages[1:]
+    assert await cache.get_or_load(pages[1], CountingLoader()) == b'[{"id":"1","title":"Dish 2"}]'
+
+
+@pytest.mark.asyncio
+async def test_cache_write_through_drops_list_beyond_index_cap(
+        redis_session: redis.Redis,
+        monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr('app.cache.CACHE_INDEX_MAX_KEYS', 2)
+    cache = RedisCache(redis_session)
+    menu_id, submenu_id = uuid.uuid4(), uuid.uuid4()
+    key, pages = f'dishes:{menu_id}:{submenu_id}:1', [f'dishes-page:{menu_id}:{submenu_id}::{i}' for i in (1, 2, 3)]
+
+    for page in pages:
+        await cache.get_or_load(page, lambda: asyncio.sleep(0, b'[{"id":"1","title":"Dish"}]'))
+
+    assert await cache.get_indexed_keys('dishes-page', menu_id, submenu_id) is None
+
+    await cache.write_through(key, lambda: asyncio.sleep(0, b'{"id":"1","title":"Dish 2"}'))
+
+    assert await cache.get_indexed_keys('dishes-page', menu_id, submenu_id) == []
+    assert await cache.get_or_load(key, CountingLoader()) == b'{"id":"1","title":"Dish 2"}'
+
+    for page in pages:
+        assert await cache.get_or_load(page, CountingLoader()) == b'1'
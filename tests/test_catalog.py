@@ -1,5 +1,12 @@
+import contextlib
+
 import pytest
 from httpx import AsyncClient
+from starlette import status
+
+from app.cache import RedisCache
+from app.config import CACHE_COMPRESSION_MIN_SIZE
+from tests.conftest import override_get_redis_session
 
 
 @pytest.mark.asyncio
@@ -10,3 +17,92 @@ async def test_catalog_get(client: AsyncClient, dishes_counts_fixture: dict[str,
     assert len(response_json) == 1
     assert len(response_json[0]['submenus']) == 1
     assert len(response.json()[0]['submenus'][0]['dishes']) == 2
+
+
+@pytest.mark.asyncio
+async def test_catalog_fields(client: AsyncClient, dishes_counts_fixture: dict[str, str]) -> None:
+    response = await client.get('/catalog')
+    menu = response.json()[0]
+    submenu = menu['submenus'][0]
+
+    assert menu['id'] == dishes_counts_fixture['menu_id']
+    assert submenu['id'] == dishes_counts_fixture['submenu_id']
+    assert set(submenu['dishes'][0]) == {'id', 'title', 'description', 'price'}
+    assert {dish['price'] for dish in submenu['dishes']} == {'12.50', '13.50'}
+
+
+async def get_payload_reads() -> int:
+    """Returns the GETs run by Redis since the last call, those of the scripts included"""
+    async with contextlib.asynccontextmanager(override_get_redis_session)() as session:
+        calls = (await session.info('commandstats')).get('cmdstat_get', {}).get('calls', 0)
+        await session.config_resetstat()
+
+    return calls
+
+
+async def invalidate_catalog() -> None:
+    async with contextlib.asynccontextmanager(override_get_redis_session)() as session:
+        await RedisCache(session).delete('catalog')
+
+
+@pytest.mark.asyncio
+async def test_catalog_small_not_compressed(client: AsyncClient, dishes_counts_fixture: dict[str, str]) -> None:
+    await invalidate_catalog()
+
+    response = await client.get('/catalog', headers={'Accept-Encoding': 'br, gzip'})
+
+    assert len(response.content) < CACHE_COMPRESSION_MIN_SIZE
+    assert 'content-encoding' not in response.headers
+    assert response.headers['vary'] == 'Accept-Encoding'
+
+
+@pytest.mark.asyncio
+async def test_catalog_compressed(
+        client: AsyncClient,
+        dishes_counts_fixture: dict[str, str],
+        monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr('app.cache.CACHE_COMPRESSION_MIN_SIZE', 1)
+    await invalidate_catalog()
+    etags = {}
+
+    for encoding in ('br', 'gzip', 'identity'):
+        response = await client.get('/catalog', headers={'Accept-Encoding': encoding})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers.get('content-encoding', 'identity') == encoding
+        assert response.headers['vary'] == 'Accept-Encoding'
+        assert response.json()[0]['id'] == dishes_counts_fixture['menu_id']
+
+        etags[encoding] = response.headers['etag']
+
+    assert len(set(etags.values())) == 3
+
+    for encoding, etag in etags.items():
+        response = await client.get('/catalog', headers={'Accept-Encoding': encoding, 'If-None-Match': etag})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers['etag'] == etag
+
+
+@pytest.mark.asyncio
+async def test_catalog_not_modified_reads_no_payload(
+        client: AsyncClient,
+        dishes_counts_fixture: dict[str, str],
+        monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr('app.cache.CACHE_COMPRESSION_MIN_SIZE', 1)
+    await invalidate_catalog()
+    etag = (await client.get('/catalog', headers={'Accept-Encoding': 'br'})).headers['etag']
+    await get_payload_reads()
+
+    response = await client.get('/catalog', headers={'Accept-Encoding': 'br', 'If-None-Match': etag})
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert await get_payload_reads() == 0
+
+    response = await client.get('/catalog', headers={'Accept-Encoding': 'br'})
+
+    assert response.headers['content-encoding'] == 'br'
+    # The compressed variant alone, not the raw payload as well
+    assert await get_payload_reads() == 1
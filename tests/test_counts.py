@@ -1,7 +1,11 @@
 import pytest
 from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from starlette import status
 
+from app.counters import check_counters
+from tests.conftest import async_engine
+
 
 @pytest.mark.asyncio
 async def test_counts_menu_get(client: AsyncClient, dishes_counts_fixture: dict[str, str]) -> None:
@@ -64,3 +68,11 @@ async def test_counts_menu_counts_zero(client: AsyncClient, dishes_counts_fixtur
     assert response.status_code == status.HTTP_200_OK
     assert response_json['submenus_count'] == 0
     assert response_json['dishes_count'] == 0
+
+
+@pytest.mark.asyncio
+async def test_counts_stored_counters_consistent(dishes_counts_fixture: dict[str, str]) -> None:
+    async with async_sessionmaker(async_engine)() as session:
+        mismatches = await check_counters(session)
+
+    assert mismatches == []
@@ -0,0 +1,108 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import create_engine, insert, select, text, update
+
+from app.database import (
+    CONSISTENCY_TOKEN_HEADER,
+    RoutingSession,
+    issue_consistency_token,
+    parse_lsn,
+    read_consistency_token,
+)
+from app.metrics import track_queries
+from app.models import Menu
+from tests.conftest import assert_max_queries, async_engine
+
+
+def test_routing_session_reads_from_replica_until_write() -> None:
+    primary, replica = create_engine('sqlite://'), create_engine('sqlite://')
+    session = RoutingSession(bind=primary, info={'replica': replica})
+
+    assert session.get_bind(clause=select(Menu)) is replica
+    assert session.get_bind(clause=insert(Menu)) is primary
+    assert session.get_bind(clause=select(Menu)) is primary
+
+
+def test_routing_session_pinned_to_primary() -> None:
+    primary, replica = create_engine('sqlite://'), create_engine('sqlite://')
+
+    assert RoutingSession(bind=primary, info={'replica': replica, 'primary': True}).get_bind(
+        clause=select(Menu)
+    ) is primary
+    assert RoutingSession(bind=primary, info={'replica': replica}).get_bind(clause=text('SELECT 1')) is primary
+    assert RoutingSession(bind=primary, info={'replica': None}).get_bind(clause=select(Menu)) is primary
+
+
+def test_parse_lsn() -> None:
+    assert parse_lsn('0/16B3748') == 0x16B3748
+    assert parse_lsn('1/0') == 1 << 32
+    assert parse_lsn('1/0') > parse_lsn('0/FFFFFFFF')
+
+
+def test_consistency_token() -> None:
+    token = issue_consistency_token('0/16B3748')
+    payload, _, signature = token.rpartition(':')
+
+    assert read_consistency_token(token) == '0/16B3748'
+    assert read_consistency_token('FFFFFFFF/FFFFFFFF') is None
+    assert read_consistency_token(f'FFFFFFFF/FFFFFFFF:{payload.rpartition(":")[2]}:{signature}') is None
+    assert read_consistency_token(f'{payload}:{"0" * len(signature)}') is None
+
+
+def test_consistency_token_expires(monkeypatch: pytest.MonkeyPatch) -> None:
+    token = issue_consistency_token('0/16B3748')
+    monkeypatch.setattr('app.database.PG_REPLICA_WAIT', -1)
+
+    assert read_consistency_token(token) is None
+
+
+@pytest.mark.asyncio
+async def test_pending_write_bypasses_cache(
+        client: AsyncClient,
+        menu_id: str,
+        monkeypatch: pytest.MonkeyPatch
+) -> None:
+    async def replica_has_replayed(lsn: str) -> bool:
+        return lsn != 'FFFFFFFF/0'
+
+    monkeypatch.setattr('app.database.replica_has_replayed', replica_has_replayed)
+    await client.get(f'/menus/{menu_id}')
+
+    async with async_engine.begin() as conn:
+        await conn.execute(update(Menu).where(Menu.id == menu_id).values(title='Menu written'))
+
+    token = issue_consistency_token('FFFFFFFF/0')
+
+    for _ in range(2):
+        with track_queries() as stats:
+            response = await client.get(f'/menus/{menu_id}', headers={CONSISTENCY_TOKEN_HEADER: token})
+
+        assert response.json()['title'] == 'Menu written'
+        assert stats.count == 1
+
+    token = issue_consistency_token('0/0')
+
+    with assert_max_queries(0):
+        response = await client.get(f'/menus/{menu_id}', headers={CONSISTENCY_TOKEN_HEADER: token})
+
+    assert response.json()['title'] != 'Menu written'
+
+
+@pytest.mark.asyncio
+async def test_forged_token_does_not_bypass_cache(
+        client: AsyncClient,
+        menu_id: str,
+        monkeypatch: pytest.MonkeyPatch
+) -> None:
+    async def replica_has_replayed(lsn: str) -> bool:
+        return False
+
+    monkeypatch.setattr('app.database.replica_has_replayed', replica_has_replayed)
+    await client.get(f'/menus/{menu_id}')
+    token = issue_consistency_token('0/0')
+
+    for forged in ('FFFFFFFF/FFFFFFFF', f'FFFFFFFF/FFFFFFFF:{token.partition(":")[2]}'):
+        with assert_max_queries(0):
+            response = await client.get(f'/menus/{menu_id}', headers={CONSISTENCY_TOKEN_HEADER: forged})
+
+        assert response.status_code == 200
@@ -1,8 +1,14 @@
+from decimal import Decimal
+from uuid import UUID
+
 import pytest
 from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from starlette import status
 
-from tests.conftest import DishState
+from app.models import content_hash
+from app.repositories import DishesRepository
+from tests.conftest import DishState, async_engine
 
 
 @pytest.mark.asyncio
@@ -49,6 +55,25 @@ async def test_dishes_list(client: AsyncClient, menu_and_submenu_ids: dict[str,
     assert len(response.json()) > 0
 
 
+@pytest.mark.asyncio
+async def test_dishes_list_pages(
+        client: AsyncClient,
+        menu_and_submenu_ids: dict[str, str],
+        dish_state: DishState
+) -> None:
+    menu_id = menu_and_submenu_ids['menu_id']
+    submenu_id = menu_and_submenu_ids['submenu_id']
+    first_page = await client.get(f'/menus/{menu_id}/submenus/{submenu_id}/dishes', params={'limit': 1})
+    next_page = await client.get(
+        f'/menus/{menu_id}/submenus/{submenu_id}/dishes',
+        params={'limit': 1, 'after': dish_state.id}
+    )
+
+    assert first_page.status_code == next_page.status_code == status.HTTP_200_OK
+    assert [dish['id'] for dish in first_page.json()] == [dish_state.id]
+    assert next_page.json() == []
+
+
 @pytest.mark.asyncio
 async def test_dishes_get(client: AsyncClient, menu_and_submenu_ids: dict[str, str], dish_state: DishState) -> None:
     menu_id = menu_and_submenu_ids['menu_id']
@@ -80,6 +105,23 @@ async def test_dishes_patch(client: AsyncClient, menu_and_submenu_ids: dict[str,
     assert response_json['price'] == dish_data['price']
 
 
+@pytest.mark.asyncio
+async def test_dishes_content_hash(
+        client: AsyncClient,
+        menu_and_submenu_ids: dict[str, str],
+        dish_state: DishState
+) -> None:
+    submenu_id = menu_and_submenu_ids['submenu_id']
+
+    async with async_sessionmaker(async_engine)() as session:
+        rows = await DishesRepository(session).get_content_hashes()
+
+    row, = [row for row in rows if row['id'] == UUID(dish_state.id)]
+    expected = content_hash(UUID(submenu_id), 'My updated dish 1', 'My updated dish description 1', Decimal('14.50'))
+
+    assert row['content_hash'] == expected
+
+
 @pytest.mark.asyncio
 async def test_dishes_delete(client: AsyncClient, menu_and_submenu_ids: dict[str, str], dish_state: DishState) -> None:
     menu_id = menu_and_submenu_ids['menu_id']
@@ -97,3 +139,33 @@ async def test_dishes_get_404(client: AsyncClient, menu_and_submenu_ids: dict[st
 
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert response.json()['detail'] == 'dish not found'
+
+
+@pytest.mark.asyncio
+async def test_dishes_bulk(client: AsyncClient, menu_and_submenu_ids: dict[str, str]) -> None:
+    menu_id = menu_and_submenu_ids['menu_id']
+    submenu_id = menu_and_submenu_ids['submenu_id']
+    url = f'/menus/{menu_id}/submenus/{submenu_id}/dishes'
+    dishes_data = [
+        {'title': f'My bulk dish {i}', 'description': f'My bulk dish description {i}', 'price': '10.00'}
+        for i in range(3)
+    ]
+    created = await client.post(f'{url}/bulk', json={'create': dishes_data})
+    first_id, second_id, third_id = [dish['id'] for dish in created.json()['created']]
+    submenu = await client.get(f'/menus/{menu_id}/submenus/{submenu_id}')
+    bulk_data = {
+        'update': {first_id: {**dishes_data[0], 'price': '11.00'}, str(UUID(int=0)): dishes_data[1]},
+        'delete': [second_id, third_id],
+    }
+    response = await client.post(f'{url}/bulk', json=bulk_data)
+    response_json = response.json()
+    dishes = await client.get(url)
+
+    assert created.status_code == response.status_code == status.HTTP_200_OK
+    assert [dish['price'] for dish in response_json['updated']] == ['11.00']
+    assert sorted(response_json['deleted']) == sorted([second_id, third_id])
+    assert submenu.json()['dishes_count'] == 3
+    assert [dish['id'] for dish in dishes.json()] == [first_id]
+    assert dishes.json()[0]['price'] == '11.00'
+
+    await client.post(f'{url}/bulk', json={'delete': [first_id]})
@@ -2,7 +2,7 @@ import pytest
 from httpx import AsyncClient
 from starlette import status
 
-from tests.conftest import State
+from tests.conftest import State, assert_max_queries
 
 
 @pytest.mark.asyncio
@@ -64,6 +64,22 @@ async def test_menu_patch(client: AsyncClient, state: State) -> None:
     assert response_json['description'] == new_menu_data['description']
 
 
+@pytest.mark.asyncio
+async def test_menu_get_not_modified(client: AsyncClient, state: State) -> None:
+    response = await client.get(f'/menus/{state.id}')
+    etag = response.headers['ETag']
+    not_modified = await client.get(f'/menus/{state.id}', headers={'If-None-Match': etag})
+
+    await client.patch(f'/menus/{state.id}', json={'title': 'My menu 1', 'description': 'My menu description 1'})
+
+    modified = await client.get(f'/menus/{state.id}', headers={'If-None-Match': etag})
+
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not_modified.content == b''
+    assert modified.status_code == status.HTTP_200_OK
+    assert modified.headers['ETag'] != etag
+
+
 @pytest.mark.asyncio
 async def test_menu_delete(client: AsyncClient, state: State) -> None:
     response = await client.delete(f'/menus/{state.id}')
@@ -77,3 +93,14 @@ async def test_menu_get_404(client: AsyncClient, state: State) -> None:
 
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert response.json()['detail'] == 'menu not found'
+
+
+@pytest.mark.asyncio
+async def test_menu_get_404_cached(client: AsyncClient, state: State) -> None:
+    first_response = await client.get(f'/menus/{state.id}')
+
+    with assert_max_queries(0):
+        second_response = await client.get(f'/menus/{state.id}')
+
+    assert first_response.status_code == second_response.status_code == status.HTTP_404_NOT_FOUND
+    assert second_response.json()['detail'] == 'menu not found'
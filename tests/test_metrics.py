@@ -0,0 +1,18 @@
+import pytest
+from httpx import AsyncClient
+from starlette import status
+
+
+@pytest.mark.asyncio
+async def test_metrics_exposed(client: AsyncClient) -> None:
+    await client.get('/menus')
+    await client.get('/menus/not-a-uuid/submenus/missing')
+    response = await client.get('http://localhost/metrics')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['content-type'].startswith('text/plain')
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/v1/menus",status="200"}' in response.text
+    assert 'route="/api/v1/menus/{menu_id}/submenus/{submenu_id}",status="422"' in response.text
+    assert 'cache_operations_total{family="menus-page",operation=' in response.text
+    assert 'db_query_duration_seconds_count{statement="SELECT"}' in response.text
+    assert 'db_pool_checked_out ' in response.text
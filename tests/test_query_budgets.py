@@ -0,0 +1,43 @@
+import pytest
+from httpx import AsyncClient
+
+from tests.conftest import assert_max_queries
+
+
+@pytest.mark.asyncio
+async def test_query_budgets_writes(client: AsyncClient, menu_id: str) -> None:
+    with assert_max_queries(2):
+        submenu = await client.post(f'/menus/{menu_id}/submenus', json={'title': 'Submenu', 'description': 'Submenu'})
+
+    submenu_id = submenu.json()['id']
+    dish_data = {'title': 'Dish', 'description': 'Dish', 'price': '1.00'}
+
+    with assert_max_queries(2):
+        await client.post(f'/menus/{menu_id}/submenus/{submenu_id}/dishes', json=dish_data)
+
+    # The write-through reads the updated row again once the cache versions are watched
+    with assert_max_queries(3):
+        await client.patch(f'/menus/{menu_id}/submenus/{submenu_id}', json={'title': 'Menu', 'description': 'Menu'})
+
+
+@pytest.mark.asyncio
+async def test_query_budgets_reads(client: AsyncClient, menu_and_submenu_ids: dict[str, str]) -> None:
+    menu_id = menu_and_submenu_ids['menu_id']
+    submenu_id = menu_and_submenu_ids['submenu_id']
+    urls = (
+        '/menus',
+        f'/menus/{menu_id}',
+        f'/menus/{menu_id}/submenus',
+        f'/menus/{menu_id}/submenus/{submenu_id}',
+        f'/menus/{menu_id}/submenus/{submenu_id}/dishes',
+        '/catalog',
+    )
+
+    for url in urls:
+        with assert_max_queries(1):
+            response = await client.get(url)
+
+        assert 'db;dur=' in response.headers['server-timing']
+
+        with assert_max_queries(0):
+            await client.get(url)
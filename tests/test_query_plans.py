@@ -0,0 +1,143 @@
+import contextlib
+import uuid
+from typing import Any, AsyncGenerator, Awaitable, Callable, Iterator
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.repositories import DishesRepository, MenuRepository, SubmenuRepository
+from app.specifications import (
+    DishListSpecification,
+    DishSpecification,
+    MenuSpecification,
+    SubmenuListSpecification,
+    SubmenuSpecification,
+)
+from benchmarks.seed import delete_catalog, generate_catalog, insert_catalog
+from tests.conftest import async_engine
+
+MENUS_COUNT = 20
+SUBMENUS_COUNT = 10
+DISHES_COUNT = 20
+PAGE_SIZE = 100
+
+SCAN_NODES = {'Seq Scan', 'Index Scan', 'Index Only Scan', 'Bitmap Index Scan'}
+
+
+@pytest_asyncio.fixture(scope='module', name='large_catalog')
+async def get_large_catalog() -> AsyncGenerator[dict[str, uuid.UUID], Any]:
+    catalog = generate_catalog(MENUS_COUNT, SUBMENUS_COUNT, DISHES_COUNT)
+
+    async with async_engine.begin() as conn:
+        await insert_catalog(conn, catalog)
+        await conn.execute(text('ANALYZE menu, submenu, dish'))
+
+    yield {
+        'menu_id': catalog['menus'][-1]['id'],
+        'submenu_id': catalog['submenus'][-1]['id'],
+        'dish_id': catalog['dishes'][-1]['id'],
+    }
+
+    async with async_engine.begin() as conn:
+        await delete_catalog(conn, catalog)
+
+
+@contextlib.contextmanager
+def capture_statements() -> Iterator[list[tuple[str, Any]]]:
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append((statement, parameters))
+
+    event.listen(async_engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def get_scans(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    if plan['Node Type'] in SCAN_NODES:
+        yield plan
+
+    for child in plan.get('Plans', ()):
+        yield from get_scans(child)
+
+
+async def assert_index_lookups(
+        query: Callable[[AsyncSession], Awaitable[Any]],
+        full_scans: tuple[str, ...] = ()
+) -> None:
+    """Asserts that every table read by the query is looked up by an index condition, except the
+    tables listed in `full_scans`, which are read in full
+
+    Sequential scans are disabled, so the planner falls back to them only when no index fits.
+    """
+    async with async_sessionmaker(async_engine)() as session:
+        with capture_statements() as statements:
+            await query(session)
+
+    assert statements
+
+    for statement, parameters in statements:
+        async with async_engine.begin() as conn:
+            await conn.execute(text('SET LOCAL enable_seqscan = off'))
+            result = await conn.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters)
+            plan = result.scalar_one()[0]['Plan']
+
+        for scan in get_scans(plan):
+            if scan.get('Relation Name') not in full_scans:
+                assert scan['Node Type'] != 'Seq Scan', statement
+                assert 'Index Cond' in scan, statement
+
+
+@pytest.mark.asyncio
+async def test_query_plans_menus(large_catalog: dict[str, uuid.UUID]) -> None:
+    menu_id = large_catalog['menu_id']
+
+    await assert_index_lookups(lambda session: MenuRepository(session).get(MenuSpecification(menu_id)))
+    await assert_index_lookups(lambda session: MenuRepository(session).get_list(limit=PAGE_SIZE), ('menu',))
+    await assert_index_lookups(lambda session: MenuRepository(session).get_list(limit=PAGE_SIZE, after=menu_id))
+
+
+@pytest.mark.asyncio
+async def test_query_plans_catalog(large_catalog: dict[str, uuid.UUID]) -> None:
+    await assert_index_lookups(lambda session: MenuRepository(session).get_catalog_json(), ('menu',))
+
+
+@pytest.mark.asyncio
+async def test_query_plans_submenus(large_catalog: dict[str, uuid.UUID]) -> None:
+    menu_id = large_catalog['menu_id']
+    submenu_id = large_catalog['submenu_id']
+
+    await assert_index_lookups(
+        lambda session: SubmenuRepository(session).get(SubmenuSpecification(menu_id, submenu_id))
+    )
+    await assert_index_lookups(
+        lambda session: SubmenuRepository(session).get_list(SubmenuListSpecification(menu_id), PAGE_SIZE)
+    )
+    await assert_index_lookups(
+        lambda session: SubmenuRepository(session).get_list(SubmenuListSpecification(menu_id), PAGE_SIZE, submenu_id)
+    )
+
+
+@pytest.mark.asyncio
+async def test_query_plans_dishes(large_catalog: dict[str, uuid.UUID]) -> None:
+    menu_id = large_catalog['menu_id']
+    submenu_id = large_catalog['submenu_id']
+    dish_id = large_catalog['dish_id']
+
+    await assert_index_lookups(
+        lambda session: DishesRepository(session).get(DishSpecification(menu_id, submenu_id, dish_id))
+    )
+    await assert_index_lookups(
+        lambda session: DishesRepository(session).get_list(DishListSpecification(menu_id, submenu_id), PAGE_SIZE)
+    )
+    await assert_index_lookups(
+        lambda session: DishesRepository(session).get_list(
+            DishListSpecification(menu_id, submenu_id), PAGE_SIZE, dish_id
+        )
+    )
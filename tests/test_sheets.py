@@ -0,0 +1,35 @@
+import csv
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.config import XLSX_PATH
+from app.sheets import COLUMNS_COUNT, read_catalog, read_rows
+
+
+def test_sheets_formats_parsed_alike(tmp_path: Path) -> None:
+    rows = list(read_rows(XLSX_PATH))
+    csv_path = tmp_path / 'Menu.csv'
+    parquet_path = tmp_path / 'Menu.parquet'
+
+    with open(csv_path, 'w', newline='', encoding='utf-8') as file:
+        csv.writer(file).writerows(rows)
+
+    columns = {
+        f'column_{i}': [None if row[i] is None else str(row[i]) for row in rows] for i in range(COLUMNS_COUNT)
+    }
+
+    pq.write_table(pa.table(columns), parquet_path)
+
+    items = list(read_catalog(XLSX_PATH))
+
+    assert [item_type for item_type, _ in items].count('dish') > 0
+    assert list(read_catalog(str(csv_path))) == items
+    assert list(read_catalog(str(parquet_path))) == items
+
+
+def test_sheets_unsupported_format() -> None:
+    with pytest.raises(ValueError):
+        list(read_rows('Menu.ods'))
@@ -0,0 +1,18 @@
+from app.utils import negotiate_encoding
+
+
+def test_negotiate_encoding_prefers_server_order() -> None:
+    assert negotiate_encoding('gzip, deflate, br', ['br', 'gzip']) == 'br'
+    assert negotiate_encoding('gzip;q=0.5, br;q=1.0', ['br', 'gzip']) == 'br'
+
+
+def test_negotiate_encoding_respects_refusals() -> None:
+    assert negotiate_encoding('br;q=0, gzip', ['br', 'gzip']) == 'gzip'
+    assert negotiate_encoding('*;q=0', ['br', 'gzip']) is None
+    assert negotiate_encoding('identity', ['br', 'gzip']) is None
+    assert negotiate_encoding('', ['br', 'gzip']) is None
+
+
+def test_negotiate_encoding_wildcard() -> None:
+    assert negotiate_encoding('*', ['br', 'gzip']) == 'br'
+    assert negotiate_encoding('br;q=0, *', ['br', 'gzip']) == 'gzip'
@@ -0,0 +1,25 @@
+import contextlib
+
+import pytest
+from httpx import AsyncClient
+
+from app.services.warmup import WarmUpService
+from tests.conftest import assert_max_queries, override_get_async_session, override_get_redis_session
+
+
+@pytest.mark.asyncio
+async def test_warmup_caches_menus_and_lists(client: AsyncClient, menu_and_submenu_ids: dict[str, str]) -> None:
+    menu_id = menu_and_submenu_ids['menu_id']
+    submenu_id = menu_and_submenu_ids['submenu_id']
+    service = WarmUpService(concurrency=2)
+    service.db_session = contextlib.asynccontextmanager(override_get_async_session)
+    service.redis_session = contextlib.asynccontextmanager(override_get_redis_session)
+
+    assert await service.execute() == 0
+
+    with assert_max_queries(0):
+        await client.get('/menus')
+        await client.get(f'/menus/{menu_id}')
+        await client.get(f'/menus/{menu_id}/submenus')
+        await client.get(f'/menus/{menu_id}/submenus/{submenu_id}/dishes')
+        await client.get('/catalog')